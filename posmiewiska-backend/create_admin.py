@@ -8,7 +8,9 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from src.models.user import db
 from src.models.admin import Admin
 from src.main import app
+from src.routes.auth import invalidate_admin
 from werkzeug.security import generate_password_hash
+from src.utils.passwords import password_hasher
 
 def create_admin(username, password):
     """Tworzy nowego administratora"""
@@ -22,7 +24,7 @@ def create_admin(username, password):
         # Utwórz nowego administratora
         admin = Admin(
             username=username,
-            password_hash=generate_password_hash(password)
+            password_hash=generate_password_hash(password, password_hasher.method)
         )
         
         try:
@@ -57,6 +59,7 @@ def delete_admin(username):
         try:
             db.session.delete(admin)
             db.session.commit()
+            invalidate_admin(admin.id)
             print(f"✅ Administrator '{username}' został usunięty!")
             return True
         except Exception as e:
@@ -73,8 +76,9 @@ def change_password(username, new_password):
             return False
         
         try:
-            admin.password_hash = generate_password_hash(new_password)
+            admin.password_hash = generate_password_hash(new_password, password_hasher.method)
             db.session.commit()
+            invalidate_admin(admin.id)
             print(f"✅ Hasło administratora '{username}' zostało zmienione!")
             return True
         except Exception as e:
@@ -11,9 +11,11 @@ preload_app = True
 user = "root"
 group = "root"
 tmp_upload_dir = None
+# /api/players/stream obsługuje gunicorn.stream.conf.py - tutaj otwarte połączenie
+# zajęłoby cały worker sync, więc endpoint odpowiada 503
+raw_env = ['SSE_MAX_SUBSCRIBERS=0']
 secure_scheme_headers = {
     'X-FORWARDED-PROTOCOL': 'ssl',
     'X-FORWARDED-PROTO': 'https',
     'X-FORWARDED-SSL': 'on'
 }
-
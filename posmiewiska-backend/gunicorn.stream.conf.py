@@ -0,0 +1,20 @@
+# Gunicorn configuration file for /api/players/stream (Server-Sent Events)
+# Worker gevent - bezczynne połączenie to greenlet czekający na zdarzenie, a nie wątek
+# ani proces, więc jeden worker utrzymuje setki połączeń
+bind = "127.0.0.1:5001"
+workers = 1
+worker_class = "gevent"
+worker_connections = 1000
+timeout = 30
+keepalive = 2
+# Bez preload - gevent musi podmienić moduły threading/socket przed importem aplikacji
+preload_app = False
+user = "root"
+group = "root"
+tmp_upload_dir = None
+raw_env = ['SSE_MAX_SUBSCRIBERS=900']
+secure_scheme_headers = {
+    'X-FORWARDED-PROTOCOL': 'ssl',
+    'X-FORWARDED-PROTO': 'https',
+    'X-FORWARDED-SSL': 'on'
+}
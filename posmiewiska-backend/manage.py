@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import sys
+import os
+
+# Dodaj ścieżkę do aplikacji
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.models.player import Player
+from src.main import app
+from src.utils.minotar import minotar
+from src.utils.importer import IMPORT_CONFLICT_MODES, PlayerImporter, iter_import_rows
+from src.utils.archive import ARCHIVE_AFTER_DAYS, archive_inactive_players, compact_database
+
+def warm_avatars(sizes, kinds):
+    """Rozgrzewa cache awatarów dla wszystkich aktywnych graczy"""
+    with app.app_context():
+        nicknames = [nickname for (nickname,) in Player.query.filter_by(is_active=True).with_entities(Player.nickname)]
+    
+    if not nicknames:
+        print("Brak aktywnych graczy na liście.")
+        return True
+    
+    print(f"Rozgrzewanie cache dla {len(nicknames)} graczy (rozmiary: {sizes}, rodzaje: {kinds})...")
+    results = minotar.prefetch(nicknames, sizes=sizes, kinds=kinds)
+    
+    summary = {}
+    for result in results:
+        summary[result['status']] = summary.get(result['status'], 0) + 1
+        if result['status'] in ('error', 'invalid'):
+            print(f"❌ {result['nickname']} ({result['kind']}, {result['size']}px): {result['status']}")
+    
+    print(f"✅ Gotowe: " + ", ".join(f"{status}: {count}" for status, count in sorted(summary.items())))
+    return summary.get('error', 0) == 0
+
+def import_players(path, on_conflict='skip'):
+    """Importuje graczy z pliku NDJSON lub CSV (format według rozszerzenia)"""
+    import_format = 'csv' if path.lower().endswith('.csv') else 'ndjson'
+    
+    try:
+        with open(path, encoding='utf-8', newline='') as f, app.app_context():
+            report = PlayerImporter(on_conflict=on_conflict).run(iter_import_rows(f, import_format))
+    except OSError as e:
+        print(f"❌ Nie można otworzyć pliku {path}: {e}")
+        return False
+    
+    for row in report['rows']:
+        if row['status'] in ('invalid', 'duplicate', 'error'):
+            print(f"❌ Wiersz {row['row']} ({row['nickname']}): {row['error']}")
+    
+    print(f"✅ Gotowe: " + ", ".join(f"{status}: {count}" for status, count in sorted(report['summary'].items())))
+    return report['summary'].get('error', 0) == 0
+
+def archive_players(older_than_days):
+    """Przenosi dawno usuniętych graczy do archiwum i kompaktuje bazę"""
+    with app.app_context():
+        archived = archive_inactive_players(older_than_days)
+        print(f"Przeniesiono do archiwum {archived} graczy usuniętych ponad {older_than_days} dni temu")
+        result = compact_database()
+    
+    if result['vacuum'] == 'full':
+        print("Baza przełączona na auto_vacuum=INCREMENTAL (jednorazowy pełny VACUUM)")
+    print(f"✅ Gotowe: zwolnione strony: {result['freed_pages']}, statystyki odświeżone (ANALYZE)")
+    return True
+
+def print_usage():
+    """Wyświetla instrukcję użycia"""
+    print("Użycie:")
+    print("  python manage.py warm-avatars [rozmiary] [rodzaje]  - Rozgrzewa cache awatarów wszystkich graczy")
+    print("  python manage.py import <plik> [skip|update]        - Importuje graczy z pliku .ndjson lub .csv")
+    print(f"  python manage.py archive [dni]                      - Archiwizuje graczy usuniętych ponad N dni temu (domyślnie {ARCHIVE_AFTER_DAYS})")
+    print("")
+    print("Przykłady:")
+    print("  python manage.py warm-avatars")
+    print("  python manage.py warm-avatars 32,64 avatar,helm")
+    print("  python manage.py import lista.csv update")
+    print("  python manage.py archive 90")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print_usage()
+        sys.exit(1)
+    
+    command = sys.argv[1].lower()
+    
+    if command == "warm-avatars":
+        if len(sys.argv) > 4:
+            print("❌ Błędna liczba argumentów dla komendy 'warm-avatars'")
+            print("Użycie: python manage.py warm-avatars [rozmiary] [rodzaje]")
+            sys.exit(1)
+        
+        try:
+            sizes = [int(size) for size in sys.argv[2].split(',')] if len(sys.argv) > 2 else [64]
+        except ValueError:
+            print("❌ Rozmiary muszą być liczbami, np. 32,64")
+            sys.exit(1)
+        kinds = sys.argv[3].split(',') if len(sys.argv) > 3 else ['avatar']
+        
+        if not warm_avatars(sizes, kinds):
+            sys.exit(1)
+    
+    elif command == "import":
+        if len(sys.argv) not in (3, 4):
+            print("❌ Błędna liczba argumentów dla komendy 'import'")
+            print("Użycie: python manage.py import <plik> [skip|update]")
+            sys.exit(1)
+        
+        on_conflict = sys.argv[3].lower() if len(sys.argv) > 3 else 'skip'
+        if on_conflict not in IMPORT_CONFLICT_MODES:
+            print("❌ Tryb musi być jednym z: " + ", ".join(IMPORT_CONFLICT_MODES))
+            sys.exit(1)
+        
+        if not import_players(sys.argv[2], on_conflict):
+            sys.exit(1)
+    
+    elif command == "archive":
+        if len(sys.argv) > 3:
+            print("❌ Błędna liczba argumentów dla komendy 'archive'")
+            print("Użycie: python manage.py archive [dni]")
+            sys.exit(1)
+        
+        try:
+            older_than_days = int(sys.argv[2]) if len(sys.argv) > 2 else ARCHIVE_AFTER_DAYS
+        except ValueError:
+            older_than_days = -1
+        if older_than_days < 0:
+            print("❌ Liczba dni musi być nieujemną liczbą całkowitą")
+            sys.exit(1)
+        
+        if not archive_players(older_than_days):
+            sys.exit(1)
+    
+    else:
+        print(f"❌ Nieznana komenda: {command}")
+        print_usage()
+        sys.exit(1)
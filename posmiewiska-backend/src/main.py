@@ -8,9 +8,17 @@ from flask_cors import CORS
 from src.models.user import db
 from src.models.player import Player
 from src.models.admin import Admin
+from src.models.counter import Counter
+from src.models.player_archive import PlayerArchive
 from src.routes.user import user_bp
 from src.routes.players import players_bp
 from src.routes.auth import auth_bp
+from src.routes.avatars import avatars_bp
+from src.utils.changes import ensure_change_feed
+from src.utils.database import configure_database, init_engines
+from src.utils.player_counts import ensure_player_counts
+from src.utils.schema import ensure_schema
+from src.utils.search import ensure_search_index
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
@@ -21,13 +29,23 @@ CORS(app, origins=['http://localhost:3000', 'http://127.0.0.1:3000'])
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(players_bp, url_prefix='/api')
 app.register_blueprint(auth_bp, url_prefix='/api')
+app.register_blueprint(avatars_bp, url_prefix='/api')
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Baza z DATABASE_URL (domyślnie src/database/app.db), dla SQLite: WAL i osobna pula do odczytu
+configure_database(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Nagłówek Cache-Control dla publicznych odpowiedzi z listą graczy
+app.config['PLAYERS_CACHE_CONTROL'] = os.environ.get('PLAYERS_CACHE_CONTROL', 'public, no-cache')
+# Czy odpowiedzi API mają wskazywać awatary z lokalnego proxy /api/avatars zamiast Minotar
+app.config['LOCAL_AVATARS'] = os.environ.get('LOCAL_AVATARS', 'true').lower() in ('1', 'true', 'yes')
 db.init_app(app)
 with app.app_context():
+    init_engines(db)
     db.create_all()
+    ensure_schema()
+    ensure_change_feed()
+    ensure_search_index()
+    ensure_player_counts()
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
@@ -1,7 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from src.models.user import db
+from src.utils.passwords import password_hasher
 
 class Admin(db.Model):
     __tablename__ = 'admins'
@@ -19,12 +19,16 @@ class Admin(db.Model):
         return f'<Admin {self.username}>'
     
     def set_password(self, password):
-        """Hashuje i zapisuje hasło"""
-        self.password_hash = generate_password_hash(password)
+        """Hashuje i zapisuje hasło (w puli procesów - może zgłosić PasswordHasherBusy)"""
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        """Sprawdza czy podane hasło jest poprawne"""
-        return check_password_hash(self.password_hash, password)
+        """Sprawdza czy podane hasło jest poprawne (może zgłosić PasswordHasherBusy)"""
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Czy hash powstał innymi parametrami niż PASSWORD_HASH_METHOD"""
+        return password_hasher.needs_rehash(self.password_hash)
     
     def to_dict(self, include_sensitive=False):
         data = {
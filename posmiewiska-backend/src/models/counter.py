@@ -0,0 +1,44 @@
+from src.models.user import db
+
+class Counter(db.Model):
+    """Nazwany licznik w bazie (np. numer sekwencyjny zmian na liście graczy, liczba aktywnych graczy)"""
+    __tablename__ = 'counters'
+    
+    name = db.Column(db.String(128), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<Counter {self.name}={self.value}>'
+    
+    @classmethod
+    def increment(cls, name, amount=1):
+        """
+        Zwiększa licznik w bieżącej transakcji i zwraca nową wartość
+
+        UPDATE blokuje wiersz licznika do końca transakcji, więc kolejne wartości
+        są przydzielane w kolejności zatwierdzania zapisów.
+        """
+        result = db.session.execute(
+            db.update(cls).where(cls.name == name).values(value=cls.value + amount)
+        )
+        if result.rowcount == 0:
+            db.session.add(cls(name=name, value=amount))
+            db.session.flush()
+            return amount
+        return db.session.execute(db.select(cls.value).where(cls.name == name)).scalar_one()
+    
+    @classmethod
+    def raise_to(cls, name, value):
+        """Ustawia licznik na value, jeśli jest mniejszy - w bieżącej transakcji"""
+        result = db.session.execute(
+            db.update(cls).where(cls.name == name, cls.value < value).values(value=value)
+        )
+        if result.rowcount == 0 and db.session.get(cls, name) is None:
+            db.session.add(cls(name=name, value=value))
+            db.session.flush()
+    
+    @classmethod
+    def get_value(cls, name):
+        """Zwraca wartość licznika (0 jeśli nie istnieje)"""
+        value = db.session.execute(db.select(cls.value).where(cls.name == name)).scalar()
+        return value or 0
@@ -1,43 +1,86 @@
+from flask import current_app, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy.orm import validates
 from src.models.user import db
 
+def normalize_nickname(nickname):
+    """Klucz porównywania nicków - Minecraft nie rozróżnia wielkości liter"""
+    return nickname.strip().lower() if nickname else nickname
+
 class Player(db.Model):
     __tablename__ = 'players'
     
     id = db.Column(db.Integer, primary_key=True)
-    nickname = db.Column(db.String(16), unique=True, nullable=False)  # Minecraft nickname (max 16 chars)
+    nickname = db.Column(db.String(16), nullable=False)  # Minecraft nickname (max 16 chars)
+    nickname_key = db.Column(db.String(16))  # Nick małymi literami - unikalny wśród aktywnych wpisów
     reason = db.Column(db.Text, nullable=False)  # Powód zgłoszenia
     reported_by = db.Column(db.String(100), nullable=False)  # Kto zgłosił
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)  # Czy wpis jest aktywny
+    change_seq = db.Column(db.Integer, index=True)  # Numer ostatniej zmiany (kanał /players/changes)
+    
+    __table_args__ = (
+        # Indeks pod paginację kursorową - tylko aktywne wpisy, kolejność (created_at, id)
+        db.Index(
+            'ix_players_active_created_id', created_at, id,
+            sqlite_where=is_active == True,
+            postgresql_where=is_active == True
+        ),
+        # Wyszukiwanie wpisów o danym nicku, także usuniętych (reaktywacja przy ponownym zgłoszeniu)
+        db.Index('ix_players_nickname_key', nickname_key),
+        # Ten sam nick (bez względu na wielkość liter) może być aktywny tylko raz;
+        # usunięte wpisy nie blokują ponownego zgłoszenia
+        db.Index(
+            'ux_players_active_nickname_key', nickname_key,
+            unique=True,
+            sqlite_where=is_active == True,
+            postgresql_where=is_active == True
+        ),
+    )
     
     def __repr__(self):
         return f'<Player {self.nickname}>'
     
-    def get_avatar_url(self, size=64):
-        """Zwraca URL do awatara gracza z Minotar"""
+    @validates('nickname')
+    def _set_nickname_key(self, key, nickname):
+        self.nickname_key = normalize_nickname(nickname)
+        return nickname
+    
+    def get_avatar_url(self, size=64, local=False):
+        """Zwraca URL do awatara gracza z Minotar (lub z lokalnego proxy)"""
         from src.utils.minotar import minotar
+        if local:
+            return minotar.get_local_url(self.nickname, 'avatar', size)
         return minotar.get_avatar_url(self.nickname, size)
     
-    def get_helm_url(self, size=64):
-        """Zwraca URL do awatara z hełmem gracza z Minotar"""
+    def get_helm_url(self, size=64, local=False):
+        """Zwraca URL do awatara z hełmem gracza z Minotar (lub z lokalnego proxy)"""
         from src.utils.minotar import minotar
+        if local:
+            return minotar.get_local_url(self.nickname, 'helm', size)
         return minotar.get_helm_url(self.nickname, size)
     
-    def get_body_url(self, size=64):
-        """Zwraca URL do pełnego ciała gracza z Minotar"""
+    def get_body_url(self, size=64, local=False):
+        """Zwraca URL do pełnego ciała gracza z Minotar (lub z lokalnego proxy)"""
         from src.utils.minotar import minotar
+        if local:
+            return minotar.get_local_url(self.nickname, 'body', size)
         return minotar.get_body_url(self.nickname, size)
     
-    def to_dict(self, include_avatar_sizes=None):
+    def to_dict(self, include_avatar_sizes=None, local_avatars=None):
         """
         Konwertuje obiekt do słownika
         
         Args:
             include_avatar_sizes (list): Lista rozmiarów awatarów do dołączenia
+            local_avatars (bool): Czy zwracać URL-e lokalnego proxy /api/avatars zamiast
+                Minotar (domyślnie według ustawienia LOCAL_AVATARS aplikacji)
         """
+        if local_avatars is None:
+            local_avatars = has_app_context() and current_app.config.get('LOCAL_AVATARS', False)
+        
         data = {
             'id': self.id,
             'nickname': self.nickname,
@@ -46,7 +89,7 @@ class Player(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': self.is_active,
-            'avatar_url': self.get_avatar_url(64)  # Domyślny rozmiar 64px
+            'avatar_url': self.get_avatar_url(64, local=local_avatars)  # Domyślny rozmiar 64px
         }
         
         # Dodanie różnych rozmiarów awatarów jeśli zostały określone
@@ -54,10 +97,9 @@ class Player(db.Model):
             data['avatars'] = {}
             for size in include_avatar_sizes:
                 data['avatars'][f'{size}px'] = {
-                    'avatar': self.get_avatar_url(size),
-                    'helm': self.get_helm_url(size),
-                    'body': self.get_body_url(size)
+                    'avatar': self.get_avatar_url(size, local=local_avatars),
+                    'helm': self.get_helm_url(size, local=local_avatars),
+                    'body': self.get_body_url(size, local=local_avatars)
                 }
         
         return data
-
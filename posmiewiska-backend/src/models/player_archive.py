@@ -0,0 +1,21 @@
+from datetime import datetime
+from src.models.user import db
+
+class PlayerArchive(db.Model):
+    """Usunięci gracze przeniesieni z tabeli players po okresie przechowywania (manage.py archive)"""
+    __tablename__ = 'players_archive'
+
+    id = db.Column(db.Integer, primary_key=True)
+    player_id = db.Column(db.Integer, nullable=False, index=True)  # Id wpisu w tabeli players
+    nickname = db.Column(db.String(16), nullable=False)
+    nickname_key = db.Column(db.String(16), index=True)
+    reason = db.Column(db.Text, nullable=False)
+    reported_by = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)  # Data usunięcia z listy
+    change_seq = db.Column(db.Integer)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PlayerArchive {self.nickname}>'
+
@@ -1,6 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from src.utils.database import RoutingSession
 
-db = SQLAlchemy()
+# Odczyty żądań GET trafiają do osobnej puli połączeń tylko do odczytu (src/utils/database.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
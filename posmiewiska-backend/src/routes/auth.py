@@ -1,9 +1,13 @@
 from flask import Blueprint, request, jsonify, session
 from src.models.user import db
 from src.models.admin import Admin
+from src.utils.passwords import PasswordHasherBusy
+from src.utils.response_cache import response_cache
 from datetime import datetime, timedelta
 import jwt
 import re
+import threading
+import time
 from functools import wraps
 
 auth_bp = Blueprint('auth', __name__)
@@ -12,6 +16,13 @@ auth_bp = Blueprint('auth', __name__)
 JWT_SECRET = 'your-secret-key-change-in-production'
 JWT_EXPIRATION_HOURS = 24
 
+def busy_response():
+    """Odpowiedź 503 gdy kolejka haszowania haseł jest pełna"""
+    response = jsonify({'error': 'Serwer jest przeciążony, spróbuj ponownie za chwilę'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
 def validate_email(email):
     """Walidacja adresu email"""
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
@@ -36,18 +47,113 @@ def generate_jwt_token(admin_id):
     }
     return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
 
-def verify_jwt_token(token):
-    """Weryfikacja JWT tokenu"""
+def decode_jwt_token(token):
+    """Dekodowanie i weryfikacja JWT tokenu - zwraca payload lub None"""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
-        return payload['admin_id']
+        return jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+def verify_jwt_token(token):
+    """Weryfikacja JWT tokenu"""
+    payload = decode_jwt_token(token)
+    return payload['admin_id'] if payload else None
+
+class AdminSnapshot:
+    """Niezmienna kopia danych administratora - bezpieczna do trzymania w cache między żądaniami"""
+    
+    def __init__(self, admin):
+        self.id = admin.id
+        self.username = admin.username
+        self.is_super_admin = admin.is_super_admin
+        self._data = admin.to_dict()
+    
+    def to_dict(self):
+        return dict(self._data)
+
+class AdminAuthCache:
+    """
+    Cache zweryfikowanych tokenów: token -> dane administratora
+
+    Oszczędza dekodowanie JWT i zapytanie do bazy przy każdym żądaniu administratora.
+    Wpisy wygasają po TTL (nie później niż sam token), a zmiana hasła lub usunięcie
+    konta podbija generację 'admins' - pozostałe workery czyszczą wtedy swój cache.
+    """
+    
+    TTL_SECONDS = 60
+    MAX_ENTRIES = 1000
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = None
+    
+    def _check_generation(self):
+        generation = response_cache.get_generation('admins')
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+    
+    def get(self, token):
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[token]
+                return None
+            return snapshot
+    
+    def put(self, token, snapshot, token_expires_at):
+        with self._lock:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                now = time.time()
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+                if len(self._entries) >= self.MAX_ENTRIES:
+                    self._entries.clear()
+            self._entries[token] = (snapshot, min(time.time() + self.TTL_SECONDS, token_expires_at))
+    
+    def invalidate_admin(self, admin_id):
+        """Usuwa wpisy administratora w tym procesie i unieważnia cache pozostałych workerów"""
+        with self._lock:
+            self._entries = {k: v for k, v in self._entries.items() if v[0].id != admin_id}
+        response_cache.bump_generation('admins')
+
+admin_auth_cache = AdminAuthCache()
+
+def invalidate_admin(admin_id):
+    """Unieważnia zapamiętane tokeny administratora - po zmianie hasła, dezaktywacji lub usunięciu"""
+    admin_auth_cache.invalidate_admin(admin_id)
+
+def authenticate_token(token):
+    """
+    Zwraca dane aktywnego administratora dla tokenu
+
+    Returns:
+        AdminSnapshot: Dane administratora lub None jeśli token lub konto są nieważne
+    """
+    snapshot = admin_auth_cache.get(token)
+    if snapshot is not None:
+        return snapshot
+    
+    payload = decode_jwt_token(token)
+    if not payload:
+        return None
+    
+    admin = Admin.query.filter_by(id=payload['admin_id'], is_active=True).first()
+    if not admin:
+        return None
+    
+    snapshot = AdminSnapshot(admin)
+    admin_auth_cache.put(token, snapshot, payload['exp'])
+    return snapshot
+
 def token_required(f):
-    """Dekorator wymagający ważnego JWT tokenu"""
+    """Dekorator wymagający ważnego JWT tokenu aktywnego administratora"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
         auth_header = request.headers.get('Authorization')
@@ -56,15 +162,10 @@ def token_required(f):
             return jsonify({'error': 'Brak tokenu autoryzacji'}), 401
         
         token = auth_header.split(' ')[1]
-        admin_id = verify_jwt_token(token)
-        
-        if not admin_id:
-            return jsonify({'error': 'Nieprawidłowy lub wygasły token'}), 401
+        admin = authenticate_token(token)
         
-        # Sprawdzenie czy admin nadal istnieje i jest aktywny
-        admin = Admin.query.filter_by(id=admin_id, is_active=True).first()
         if not admin:
-            return jsonify({'error': 'Konto administratora nieaktywne'}), 401
+            return jsonify({'error': 'Nieprawidłowy lub wygasły token'}), 401
         
         # Dodanie informacji o adminie do kontekstu żądania
         request.current_admin = admin
@@ -93,6 +194,10 @@ def login():
         if not admin or not admin.check_password(password):
             return jsonify({'error': 'Nieprawidłowa nazwa użytkownika lub hasło'}), 401
         
+        # Przehashowanie hasła po zmianie parametrów PASSWORD_HASH_METHOD
+        if admin.password_needs_rehash():
+            admin.set_password(password)
+        
         # Aktualizacja czasu ostatniego logowania
         admin.last_login = datetime.utcnow()
         db.session.commit()
@@ -107,6 +212,9 @@ def login():
             'expires_in': JWT_EXPIRATION_HOURS * 3600  # w sekundach
         })
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         return jsonify({'error': 'Błąd serwera'}), 500
 
@@ -142,7 +250,9 @@ def change_password():
         if not current_password or not new_password:
             return jsonify({'error': 'Aktualne i nowe hasło są wymagane'}), 400
         
-        admin = request.current_admin
+        admin = Admin.query.filter_by(id=request.current_admin.id, is_active=True).first()
+        if not admin:
+            return jsonify({'error': 'Konto administratora nieaktywne'}), 401
         
         # Sprawdzenie aktualnego hasła
         if not admin.check_password(current_password):
@@ -157,9 +267,13 @@ def change_password():
         # Ustawienie nowego hasła
         admin.set_password(new_password)
         db.session.commit()
+        invalidate_admin(admin.id)
         
         return jsonify({'message': 'Hasło zostało zmienione'})
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Błąd serwera'}), 500
@@ -202,13 +316,12 @@ def register_admin():
                 return jsonify({'error': 'Brak autoryzacji'}), 401
             
             token = auth_header.split(' ')[1]
-            admin_id = verify_jwt_token(token)
+            current_admin = authenticate_token(token)
             
-            if not admin_id:
+            if not current_admin:
                 return jsonify({'error': 'Nieprawidłowy token'}), 401
             
-            current_admin = Admin.query.filter_by(id=admin_id, is_active=True).first()
-            if not current_admin or not current_admin.is_super_admin:
+            if not current_admin.is_super_admin:
                 return jsonify({'error': 'Brak uprawnień do tworzenia nowych administratorów'}), 403
         
         # Sprawdzenie czy użytkownik już istnieje
@@ -235,6 +348,9 @@ def register_admin():
             'admin': new_admin.to_dict()
         }), 201
         
+    except PasswordHasherBusy:
+        db.session.rollback()
+        return busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Błąd serwera'}), 500
@@ -0,0 +1,45 @@
+import os
+from flask import Blueprint, jsonify, send_file
+from src.utils.minotar import minotar
+from src.routes.players import admin_required
+
+avatars_bp = Blueprint('avatars', __name__)
+
+# Awatary zmieniają się rzadko - przeglądarka może trzymać je przez dobę
+AVATAR_MAX_AGE = 24 * 3600
+DEFAULT_AVATAR_MAX_AGE = 60
+
+@avatars_bp.route('/avatars/<nickname>/<kind>/<int:size>', methods=['GET'])
+def get_avatar(nickname, kind, size):
+    """Serwowanie awatara z lokalnego cache (pobieranie z Minotar przy braku w cache)"""
+    try:
+        if kind not in minotar.AVATAR_KINDS:
+            return jsonify({'error': 'Nieznany rodzaj awatara'}), 404
+        
+        if size not in minotar.VALID_SIZES:
+            return jsonify({'error': 'Nieprawidłowy rozmiar awatara'}), 400
+        
+        if not minotar.validate_nickname(nickname):
+            return jsonify({'error': 'Nieprawidłowy nick Minecraft'}), 400
+        
+        cache_path = minotar.download_avatar(nickname, size, kind=kind, fallback=True)
+        
+        # Domyślny obrazek (Minotar niedostępny) nie może zostać w przeglądarce na długo
+        max_age = DEFAULT_AVATAR_MAX_AGE if minotar.is_default_avatar(cache_path) else AVATAR_MAX_AGE
+        
+        return send_file(
+            os.path.abspath(cache_path),
+            mimetype='image/png',
+            max_age=max_age
+        )
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@avatars_bp.route('/avatars/cache-stats', methods=['GET'])
+@admin_required
+def get_avatar_cache_stats():
+    """Statystyki zajętości cache awatarów"""
+    try:
+        return jsonify(minotar.cache_stats())
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
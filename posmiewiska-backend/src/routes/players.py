@@ -1,13 +1,51 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, send_file, stream_with_context, url_for, current_app
 from src.models.user import db
 from src.models.player import Player
-from src.models.admin import Admin
+from src.routes.auth import token_required
+from src.utils.search import apply_search
+from src.utils.player_counts import count_players, count_search_results
+from src.utils.player_writes import BATCH_OPERATIONS, apply_batch, create_player, deactivate_player, is_unique_violation, update_active_player
+from src.utils.change_stream import change_stream
+from src.utils.importer import IMPORT_CONFLICT_MODES, IMPORT_FORMATS, IMPORT_MAX_BYTES, IMPORT_MAX_ROWS, PlayerImporter, iter_import_rows
+from src.utils.export import EXPORT_FORMATS, EXPORT_STATUSES, build_export_query, generate_export
+from src.utils.changes import DEFAULT_CHANGES_LIMIT, MAX_CHANGES_LIMIT, change_to_dict, fetch_changes, requires_full_resync
+from src.utils.response_cache import cached_response, response_cache
+from src.utils.minotar import minotar
+from src.utils.player_index import player_index
+from src.utils.sprites import SPRITE_COLUMNS, SPRITE_SIZES, build_sprite_sheet, invalidate_sprite_sheets, sprite_offset
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime
+import base64
+import binascii
+import io
+import itertools
+import json
+import math
+import os
 import re
-from functools import wraps
 
 players_bp = Blueprint('players', __name__)
 
+# Maksymalna liczba nicków w jednym zapytaniu /players/check
+MAX_CHECK_NICKNAMES = 1000
+
+# Odległość edycyjna szkieletów nicków dla /players/similar (domyślna i maksymalna)
+DEFAULT_SIMILAR_DISTANCE = 1
+MAX_SIMILAR_DISTANCE = 2
+# Ile podobnych nicków zwracać w /players/check dla jednego sprawdzanego nicku
+CHECK_SIMILAR_LIMIT = 5
+# Maksymalna liczba nicków szukanych wśród podobnych w jednym zapytaniu /players/check
+MAX_CHECK_SIMILAR_NICKNAMES = 100
+
+# Liczba wyników /players/suggest i /players/similar (domyślna i maksymalna)
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+
+# Maksymalna liczba operacji w jednym zapytaniu /players/batch
+MAX_BATCH_OPERATIONS = 500
+
 def validate_minecraft_nickname(nickname):
     """Walidacja nicku Minecraft - tylko litery, cyfry i podkreślniki, 3-16 znaków"""
     if not nickname or len(nickname) < 3 or len(nickname) > 16:
@@ -23,63 +61,349 @@ def sanitize_input(text):
     text = re.sub(r'[<>"\']', '', text)
     return text.strip()
 
-# Import dekoratora z auth.py
-def admin_required(f):
-    """Dekorator wymagający uwierzytelnienia administratora - uproszczona wersja"""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        from src.routes.auth import verify_jwt_token
-        
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({'error': 'Brak autoryzacji'}), 401
-        
-        token = auth_header.split(' ')[1]
-        admin_id = verify_jwt_token(token)
-        
-        if not admin_id:
-            return jsonify({'error': 'Nieprawidłowy lub wygasły token'}), 401
-        
-        admin = Admin.query.filter_by(id=admin_id, is_active=True).first()
-        if not admin:
-            return jsonify({'error': 'Konto administratora nieaktywne'}), 401
-        
-        request.current_admin = admin
-        return f(*args, **kwargs)
-    return decorated_function
+def encode_cursor(player):
+    """Koduje pozycję (created_at, id) ostatniego gracza na stronie do nieprzezroczystego kursora"""
+    raw = json.dumps([player.created_at.isoformat(), player.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Dekoduje kursor paginacji
+
+    Returns:
+        tuple: (created_at, id) lub None jeśli kursor jest nieprawidłowy
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, player_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(player_id)
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        return None
+
+# Wspólny dekorator uwierzytelniania administratora (z cache zweryfikowanych tokenów)
+admin_required = token_required
 
 @players_bp.route('/players', methods=['GET'])
+@cached_response()
 def get_players():
     """Pobieranie listy wszystkich aktywnych graczy"""
     try:
+        # Tryb kursorowy (?cursor=...&limit=N) - stały koszt niezależnie od głębokości strony
+        if 'cursor' in request.args or 'limit' in request.args:
+            return get_players_by_cursor()
+        
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         search = request.args.get('search', '', type=str)
+        reported_by = sanitize_input(request.args.get('reported_by', '', type=str))
         
         # Ograniczenie per_page dla bezpieczeństwa
         per_page = min(per_page, 100)
+        if per_page < 1:
+            per_page = 20
+        page = max(page, 1)
         
         query = Player.query.filter_by(is_active=True)
+        if reported_by:
+            query = query.filter_by(reported_by=reported_by)
         
+        # Liczba wpisów z liczników w bazie zamiast COUNT(*) przy każdym zapytaniu;
+        # wyniki wyszukiwania liczone są tylko do SEARCH_COUNT_LIMIT
+        total_exact = True
         if search:
             search = sanitize_input(search)
-            query = query.filter(Player.nickname.ilike(f'%{search}%'))
+            query = apply_search(query, search)
+            total, total_exact = count_search_results(query)
+        else:
+            total = count_players(reported_by=reported_by or None)
         
-        players = query.order_by(Player.created_at.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        players = query.order_by(Player.created_at.desc()).offset((page - 1) * per_page).limit(per_page).all()
         
         return jsonify({
-            'players': [player.to_dict() for player in players.items],
-            'total': players.total,
-            'pages': players.pages,
+            'players': [player.to_dict() for player in players],
+            'total': total,
+            'total_exact': total_exact,
+            'pages': math.ceil(total / per_page),
             'current_page': page,
             'per_page': per_page
         })
     except Exception as e:
         return jsonify({'error': 'Błąd serwera'}), 500
 
+def fetch_cursor_page(cursor, limit, search, include_total=False):
+    """
+    Pobiera stronę aktywnych graczy od pozycji kursora
+
+    Args:
+        cursor (str): Kursor z poprzedniej strony (pusty dla pierwszej)
+        limit (int): Liczba graczy na stronie
+        search (str): Szukana fraza
+        include_total (bool): Czy policzyć wszystkie pasujące wpisy (przy wyszukiwaniu najwyżej do SEARCH_COUNT_LIMIT)
+
+    Returns:
+        tuple: (gracze, czy_jest_kolejna_strona, liczba_wszystkich lub None)
+
+    Raises:
+        ValueError: Gdy kursor jest nieprawidłowy
+    """
+    query = Player.query.filter_by(is_active=True)
+    
+    if search:
+        # Kolejność kursora musi być stabilna - bez sortowania według trafności
+        query = apply_search(query, search, ranked=False)
+    
+    total = None
+    if include_total:
+        total = count_search_results(query)[0] if search else count_players()
+    
+    if cursor:
+        position = decode_cursor(cursor)
+        if not position:
+            raise ValueError('Nieprawidłowy kursor')
+        query = query.filter(tuple_(Player.created_at, Player.id) < position)
+    
+    # Pobieramy jeden rekord więcej, żeby wiedzieć czy istnieje następna strona
+    players = query.order_by(Player.created_at.desc(), Player.id.desc()).limit(limit + 1).all()
+    has_more = len(players) > limit
+    
+    return players[:limit], has_more, total
+
+def get_players_by_cursor():
+    """Paginacja kursorowa - wyszukiwanie po (created_at, id) zamiast OFFSET"""
+    limit = request.args.get('limit', 20, type=int)
+    cursor = request.args.get('cursor', '', type=str)
+    search = sanitize_input(request.args.get('search', '', type=str))
+    include_total = request.args.get('include_total', '').lower() in ('1', 'true', 'yes')
+    sprite_size = request.args.get('sprite_size', type=int)
+    
+    # Ograniczenie limit dla bezpieczeństwa
+    limit = max(1, min(limit, 100))
+    
+    try:
+        players, has_more, total = fetch_cursor_page(cursor, limit, search, include_total)
+    except ValueError:
+        return jsonify({'error': 'Nieprawidłowy kursor'}), 400
+    
+    data = {
+        'players': [player.to_dict() for player in players],
+        'next_cursor': encode_cursor(players[-1]) if has_more else None,
+        'has_more': has_more,
+        'limit': limit
+    }
+    if include_total:
+        data['total'] = total
+    
+    # Położenie awatarów w arkuszu /players/sprites dla tej samej strony
+    if sprite_size in SPRITE_SIZES and players:
+        data['sprite'] = {
+            'url': url_for(
+                'players.get_sprite_sheet', cursor=cursor or None, limit=limit,
+                search=search or None, size=sprite_size
+            ),
+            'size': sprite_size,
+            'columns': min(len(players), SPRITE_COLUMNS)
+        }
+        for index, player_data in enumerate(data['players']):
+            player_data['sprite_offset'] = sprite_offset(index, sprite_size)
+    
+    return jsonify(data)
+
+@players_bp.route('/players/sprites', methods=['GET'])
+def get_sprite_sheet():
+    """Arkusz PNG ze wszystkimi awatarami strony graczy (paginacja kursorowa)"""
+    try:
+        limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+        cursor = request.args.get('cursor', '', type=str)
+        search = sanitize_input(request.args.get('search', '', type=str))
+        size = request.args.get('size', 64, type=int)
+        
+        if size not in SPRITE_SIZES:
+            return jsonify({'error': f'Rozmiar awatara w arkuszu: {", ".join(map(str, SPRITE_SIZES))}'}), 400
+        
+        try:
+            players, _, _ = fetch_cursor_page(cursor, limit, search)
+        except ValueError:
+            return jsonify({'error': 'Nieprawidłowy kursor'}), 400
+        
+        if not players:
+            return jsonify({'error': 'Brak graczy na stronie'}), 404
+        
+        # ETag z zawartości arkusza - zmienia się też po odświeżeniu skina gracza
+        sheet = build_sprite_sheet(players, size)
+        if sheet['etag'] in request.if_none_match:
+            response = current_app.response_class(status=304)
+        else:
+            response = send_file(os.path.abspath(sheet['path']), mimetype='image/png', etag=False)
+        
+        response.set_etag(sheet['etag'])
+        response.headers['Cache-Control'] = current_app.config.get('PLAYERS_CACHE_CONTROL', 'public, no-cache')
+        return response
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@players_bp.route('/players/changes', methods=['GET'])
+@cached_response()
+def get_player_changes():
+    """Kanał zmian listy (dodania, edycje i usunięcia) od numeru since - do synchronizacji kopii"""
+    try:
+        try:
+            since = int(request.args.get('since', 0))
+            limit = int(request.args.get('limit', DEFAULT_CHANGES_LIMIT))
+        except ValueError:
+            return jsonify({'error': 'Parametry since i limit muszą być liczbami'}), 400
+        
+        if since < 0:
+            return jsonify({'error': 'Nieprawidłowy parametr since'}), 400
+        limit = min(max(limit, 1), MAX_CHANGES_LIMIT)
+        
+        # Część usunięć od tego numeru jest już w archiwum - klient zaczyna od since=0
+        if requires_full_resync(since):
+            return jsonify({
+                'changes': [],
+                'next_since': 0,
+                'has_more': True,
+                'full_resync': True
+            })
+        
+        players, has_more = fetch_changes(since, limit)
+        
+        return jsonify({
+            'changes': [change_to_dict(player) for player in players],
+            'next_since': players[-1].change_seq if players else since,
+            'has_more': has_more,
+            'full_resync': False
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@players_bp.route('/players/stream', methods=['GET'])
+def stream_player_changes():
+    """Strumień zmian listy (Server-Sent Events) - wznawianie przez nagłówek Last-Event-ID lub ?since="""
+    try:
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+        if last_event_id is not None:
+            try:
+                last_event_id = int(last_event_id)
+            except ValueError:
+                return jsonify({'error': 'Nieprawidłowy identyfikator zdarzenia'}), 400
+        
+        subscription = change_stream.subscribe(current_app._get_current_object())
+        if subscription is None:
+            return jsonify({'error': 'Zbyt wiele połączeń, spróbuj ponownie później'}), 503
+        
+        response = Response(
+            stream_with_context(change_stream.stream(subscription, last_event_id)),
+            mimetype='text/event-stream'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # nginx nie buforuje zdarzeń
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@players_bp.route('/players/check', methods=['POST'])
+def check_players():
+    """Sprawdza wiele nicków naraz (np. przy dołączaniu graczy do serwera) - odpowiedź z pamięci"""
+    try:
+        data = request.get_json(silent=True)
+        nicknames = data.get('nicknames') if isinstance(data, dict) else None
+        
+        if not isinstance(nicknames, list) or not all(isinstance(n, str) for n in nicknames):
+            return jsonify({'error': 'Pole "nicknames" musi być listą nicków'}), 400
+        
+        if len(nicknames) > MAX_CHECK_NICKNAMES:
+            return jsonify({'error': f'Maksymalnie {MAX_CHECK_NICKNAMES} nicków w jednym zapytaniu'}), 400
+        
+        # Podobne nicki (multikonta) - tylko na żądanie, domyślnie 0 (wyłączone)
+        max_distance = data.get('max_distance', 0)
+        if not isinstance(max_distance, int) or isinstance(max_distance, bool) or not 0 <= max_distance <= MAX_SIMILAR_DISTANCE:
+            return jsonify({'error': f'Pole "max_distance" musi być liczbą od 0 do {MAX_SIMILAR_DISTANCE}'}), 400
+        
+        matches = player_index.lookup(nicknames)
+        similar = {}
+        if max_distance:
+            unmatched = list(dict.fromkeys(
+                nickname for nickname in nicknames
+                if nickname not in matches and validate_minecraft_nickname(nickname)
+            ))
+            if len(unmatched) > MAX_CHECK_SIMILAR_NICKNAMES:
+                return jsonify({
+                    'error': f'Wyszukiwanie podobnych nicków: maksymalnie {MAX_CHECK_SIMILAR_NICKNAMES} nicków spoza listy w jednym zapytaniu'
+                }), 400
+            similar = player_index.similar(unmatched, max_distance, limit=CHECK_SIMILAR_LIMIT)
+        
+        return jsonify({
+            'checked': len(nicknames),
+            'matches': [
+                {'nickname': requested, 'id': player_id, 'listed_as': nickname, 'reason': reason}
+                for requested, (player_id, nickname, reason) in matches.items()
+            ],
+            'similar': [
+                {'nickname': requested, 'id': player_id, 'listed_as': nickname, 'reason': reason, 'distance': distance}
+                for requested, found in similar.items()
+                for distance, player_id, nickname, reason in found
+            ]
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@players_bp.route('/players/similar', methods=['GET'])
+def similar_players():
+    """Nicki z listy podobne do podanego (np. multikonta: literówki, podkreślniki, cyfry zamiast liter)"""
+    try:
+        nickname = request.args.get('nickname', '', type=str).strip()
+        limit = max(1, min(request.args.get('limit', DEFAULT_SUGGESTIONS, type=int), MAX_SUGGESTIONS))
+        
+        if not validate_minecraft_nickname(nickname):
+            return jsonify({'error': 'Nieprawidłowy nick Minecraft'}), 400
+        
+        try:
+            max_distance = int(request.args.get('max_distance', DEFAULT_SIMILAR_DISTANCE))
+        except ValueError:
+            return jsonify({'error': f'Parametr max_distance musi być liczbą od 0 do {MAX_SIMILAR_DISTANCE}'}), 400
+        
+        if not 0 <= max_distance <= MAX_SIMILAR_DISTANCE:
+            return jsonify({'error': f'Parametr max_distance musi być liczbą od 0 do {MAX_SIMILAR_DISTANCE}'}), 400
+        
+        found = player_index.similar([nickname], max_distance, limit).get(nickname, [])
+        
+        return jsonify({
+            'nickname': nickname,
+            'max_distance': max_distance,
+            'similar': [
+                {'id': player_id, 'nickname': listed_as, 'reason': reason, 'distance': distance}
+                for distance, player_id, listed_as, reason in found
+            ]
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@players_bp.route('/players/suggest', methods=['GET'])
+def suggest_players():
+    """Podpowiedzi nicków po prefiksie (wyszukiwarka w trakcie pisania) - odpowiedź z pamięci"""
+    try:
+        prefix = request.args.get('prefix', '', type=str).strip()
+        limit = max(1, min(request.args.get('limit', DEFAULT_SUGGESTIONS, type=int), MAX_SUGGESTIONS))
+        
+        if not prefix or len(prefix) > 16 or not re.match(r'^[a-zA-Z0-9_]+$', prefix):
+            return jsonify({'error': 'Prefiks może zawierać tylko litery, cyfry i podkreślniki (1-16 znaków)'}), 400
+        
+        suggestions = player_index.suggest(prefix, limit)
+        
+        return jsonify({
+            'prefix': prefix,
+            'suggestions': [{'id': player_id, 'nickname': nickname} for player_id, nickname in suggestions]
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
 @players_bp.route('/players/<int:player_id>', methods=['GET'])
+@cached_response()
 def get_player(player_id):
     """Pobieranie szczegółów konkretnego gracza"""
     try:
@@ -115,20 +439,22 @@ def add_player():
         if not reported_by or len(reported_by) < 3:
             return jsonify({'error': 'Pole "zgłaszający" jest wymagane'}), 400
         
-        # Sprawdzenie czy gracz już istnieje
-        existing_player = Player.query.filter_by(nickname=nickname, is_active=True).first()
-        if existing_player:
+        # Jedna instrukcja INSERT ... ON CONFLICT - unikalność nicku pilnuje indeks w bazie,
+        # usunięty wcześniej wpis o tym nicku zostaje reaktywowany
+        try:
+            new_player = create_player(nickname, reason, reported_by)
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
             return jsonify({'error': 'Gracz już znajduje się na liście'}), 409
         
-        # Tworzenie nowego gracza
-        new_player = Player(
-            nickname=nickname,
-            reason=reason,
-            reported_by=reported_by
-        )
+        player_index.apply(new_player, response_cache.bump_generation())
+        change_stream.notify()
         
-        db.session.add(new_player)
-        db.session.commit()
+        # Rozgrzanie cache awatara w tle - pierwszy odwiedzający nie czeka na Minotar
+        minotar.prefetch([new_player.nickname], wait=False)
         
         return jsonify({
             'message': 'Gracz został dodany do czarnej listy',
@@ -144,41 +470,49 @@ def add_player():
 def update_player(player_id):
     """Aktualizacja danych gracza"""
     try:
-        player = Player.query.filter_by(id=player_id, is_active=True).first()
-        if not player:
-            return jsonify({'error': 'Gracz nie znaleziony'}), 404
-        
         data = request.get_json()
         if not data:
             return jsonify({'error': 'Brak danych'}), 400
         
+        values = {}
+        
         # Aktualizacja pól jeśli zostały podane
         if 'nickname' in data:
             nickname = sanitize_input(data['nickname'])
             if not validate_minecraft_nickname(nickname):
                 return jsonify({'error': 'Nieprawidłowy nick Minecraft'}), 400
-            
-            # Sprawdzenie czy nowy nick nie jest już zajęty
-            existing = Player.query.filter_by(nickname=nickname, is_active=True).filter(Player.id != player_id).first()
-            if existing:
-                return jsonify({'error': 'Gracz z tym nickiem już istnieje'}), 409
-            
-            player.nickname = nickname
+            values['nickname'] = nickname
         
         if 'reason' in data:
             reason = sanitize_input(data['reason'])
             if not reason or len(reason) < 10:
                 return jsonify({'error': 'Powód musi mieć co najmniej 10 znaków'}), 400
-            player.reason = reason
+            values['reason'] = reason
         
         if 'reported_by' in data:
             reported_by = sanitize_input(data['reported_by'])
             if not reported_by or len(reported_by) < 3:
                 return jsonify({'error': 'Pole "zgłaszający" jest wymagane'}), 400
-            player.reported_by = reported_by
+            values['reported_by'] = reported_by
         
-        player.updated_at = datetime.utcnow()
-        db.session.commit()
+        # Jeden UPDATE ... WHERE id AND is_active - zajęty nick zgłasza indeks unikalny
+        try:
+            player = update_active_player(player_id, values)
+            if not player:
+                db.session.rollback()
+                return jsonify({'error': 'Gracz nie znaleziony'}), 404
+            db.session.commit()
+        except IntegrityError as e:
+            db.session.rollback()
+            if not is_unique_violation(e):
+                raise
+            return jsonify({'error': 'Gracz z tym nickiem już istnieje'}), 409
+        
+        player_index.apply(player, response_cache.bump_generation())
+        change_stream.notify()
+        invalidate_sprite_sheets(player.id)
+        
+        minotar.prefetch([player.nickname], wait=False)
         
         return jsonify({
             'message': 'Dane gracza zostały zaktualizowane',
@@ -194,14 +528,15 @@ def update_player(player_id):
 def delete_player(player_id):
     """Usuwanie gracza z listy (soft delete)"""
     try:
-        player = Player.query.filter_by(id=player_id, is_active=True).first()
+        # Soft delete - oznaczenie jako nieaktywny jednym UPDATE
+        player = deactivate_player(player_id)
         if not player:
+            db.session.rollback()
             return jsonify({'error': 'Gracz nie znaleziony'}), 404
-        
-        # Soft delete - oznaczenie jako nieaktywny
-        player.is_active = False
-        player.updated_at = datetime.utcnow()
         db.session.commit()
+        player_index.apply(player, response_cache.bump_generation())
+        change_stream.notify()
+        invalidate_sprite_sheets(player.id)
         
         return jsonify({'message': 'Gracz został usunięty z listy'})
         
@@ -209,3 +544,186 @@ def delete_player(player_id):
         db.session.rollback()
         return jsonify({'error': 'Błąd serwera'}), 500
 
+def validate_batch_operation(item):
+    """Zwraca (operacja, błąd) dla jednej pozycji żądania /players/batch"""
+    if not isinstance(item, dict):
+        return None, 'Operacja musi być obiektem JSON'
+    
+    op = item.get('op')
+    player_id = item.get('id')
+    if op not in BATCH_OPERATIONS:
+        return None, 'Dostępne operacje: ' + ', '.join(BATCH_OPERATIONS)
+    if not isinstance(player_id, int) or isinstance(player_id, bool) or player_id < 1:
+        return None, 'Nieprawidłowe id gracza'
+    
+    values = {}
+    if op == 'update':
+        if 'reason' in item:
+            reason = sanitize_input(item['reason'])
+            if not reason or len(reason) < 10:
+                return None, 'Powód musi mieć co najmniej 10 znaków'
+            values['reason'] = reason
+        if 'reported_by' in item:
+            reported_by = sanitize_input(item['reported_by'])
+            if not reported_by or len(reported_by) < 3:
+                return None, 'Pole "zgłaszający" jest wymagane'
+            values['reported_by'] = reported_by
+        if not values:
+            return None, 'Brak pól do aktualizacji'
+    
+    return {'op': op, 'id': player_id, 'values': values}, None
+
+@players_bp.route('/players/batch', methods=['POST'])
+@admin_required
+def batch_players():
+    """Wiele operacji moderacji (update, delete, restore) w jednej transakcji - zwraca status każdej pozycji"""
+    try:
+        data = request.get_json(silent=True)
+        operations = data.get('operations') if isinstance(data, dict) else None
+        
+        if not isinstance(operations, list) or not operations:
+            return jsonify({'error': 'Podaj listę operacji'}), 400
+        
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            return jsonify({'error': f'Maksymalnie {MAX_BATCH_OPERATIONS} operacji naraz'}), 400
+        
+        results = []
+        valid = []
+        seen_ids = set()
+        for index, item in enumerate(operations):
+            operation, error = validate_batch_operation(item)
+            if operation and operation['id'] in seen_ids:
+                operation, error = None, 'Gracz powtarza się w partii'
+            
+            entry = {'index': index, 'op': item.get('op') if isinstance(item, dict) else None}
+            if operation:
+                seen_ids.add(operation['id'])
+                valid.append((entry, operation))
+                entry['id'] = operation['id']
+            else:
+                entry['status'] = 'invalid'
+                entry['error'] = error
+            results.append(entry)
+        
+        statuses = apply_batch([operation for entry, operation in valid])
+        db.session.commit()
+        
+        changed = []
+        for entry, operation in valid:
+            entry['status'] = statuses[operation['id']]
+            if entry['status'] == 'not_found':
+                entry['error'] = 'Gracz nie znaleziony'
+            elif entry['status'] == 'conflict':
+                entry['error'] = 'Gracz z tym nickiem już znajduje się na liście'
+            else:
+                changed.append(entry)
+        
+        if changed:
+            # Jedno unieważnienie na całą partię - indeks nicków doczyta zmiany po change_seq
+            response_cache.bump_generation()
+            change_stream.notify()
+            for entry in changed:
+                if entry['status'] != 'restored':
+                    invalidate_sprite_sheets(entry['id'])
+        
+        summary = {}
+        for entry in results:
+            summary[entry['status']] = summary.get(entry['status'], 0) + 1
+        
+        return jsonify({'summary': summary, 'results': results})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+
+@players_bp.route('/players/import', methods=['POST'])
+@admin_required
+def import_players():
+    """Import wielu graczy naraz (NDJSON lub CSV w treści żądania) - zwraca raport dla każdego wiersza"""
+    try:
+        too_large = {'error': f'Treść importu może mieć maksymalnie {IMPORT_MAX_BYTES // (1024 * 1024)} MB'}
+        if request.content_length is not None and request.content_length > IMPORT_MAX_BYTES:
+            return jsonify(too_large), 413
+        # Limit także dla treści bez Content-Length (chunked) - odczyt ponad limit zgłasza 413
+        request.max_content_length = IMPORT_MAX_BYTES
+        
+        default_format = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+        import_format = request.args.get('format', default_format)
+        on_conflict = request.args.get('on_conflict', 'skip')
+        reported_by = sanitize_input(request.args.get('reported_by', ''))
+        
+        if import_format not in IMPORT_FORMATS:
+            return jsonify({'error': 'Dostępne formaty: ' + ', '.join(IMPORT_FORMATS)}), 400
+        
+        if on_conflict not in IMPORT_CONFLICT_MODES:
+            return jsonify({'error': 'Dostępne tryby: ' + ', '.join(IMPORT_CONFLICT_MODES)}), 400
+        
+        # Treść czytana strumieniowo - w pamięci najwyżej IMPORT_MAX_ROWS wierszy, nie cały plik
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8', errors='replace', newline='')
+        # Wiersze sprawdzane przed zapisem - zbyt długi import nie zostawia w bazie połowy pliku
+        rows = list(itertools.islice(iter_import_rows(stream, import_format), IMPORT_MAX_ROWS + 1))
+        if len(rows) > IMPORT_MAX_ROWS:
+            return jsonify({'error': f'Maksymalnie {IMPORT_MAX_ROWS} wierszy w jednym imporcie'}), 400
+        
+        importer = PlayerImporter(on_conflict=on_conflict, default_reported_by=reported_by or None)
+        report = importer.run(rows)
+        
+        return jsonify(report)
+        
+    except RequestEntityTooLarge:
+        return jsonify(too_large), 413
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@players_bp.route('/players/export', methods=['GET'])
+@admin_required
+def export_players():
+    """Eksport całej listy (NDJSON lub CSV) strumieniowo, opcjonalnie skompresowany gzipem"""
+    try:
+        export_format = request.args.get('format', 'ndjson')
+        status = request.args.get('status', 'active')
+        reported_by = sanitize_input(request.args.get('reported_by', ''))
+        
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': 'Dostępne formaty: ' + ', '.join(EXPORT_FORMATS)}), 400
+        
+        if status not in EXPORT_STATUSES:
+            return jsonify({'error': 'Dostępne statusy: ' + ', '.join(EXPORT_STATUSES)}), 400
+        
+        try:
+            created_from = request.args.get('created_from')
+            created_from = datetime.fromisoformat(created_from) if created_from else None
+            created_to = request.args.get('created_to')
+            created_to = datetime.fromisoformat(created_to) if created_to else None
+        except ValueError:
+            return jsonify({'error': 'Daty muszą być w formacie ISO 8601'}), 400
+        
+        query = build_export_query(status, reported_by or None, created_from, created_to)
+        # Jakość z nagłówka Accept-Encoding - gzip;q=0 oznacza odmowę (uwzględnia też *)
+        compress = request.accept_encodings['gzip'] > 0
+        
+        response = Response(
+            stream_with_context(generate_export(query, export_format, compress)),
+            mimetype=EXPORT_FORMATS[export_format]
+        )
+        filename = f"players-{datetime.utcnow().strftime('%Y%m%d')}.{export_format}"
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response.headers['Cache-Control'] = 'no-store'
+        response.headers['Vary'] = 'Accept-Encoding'
+        if compress:
+            response.headers['Content-Encoding'] = 'gzip'
+        return response
+        
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
+
+@players_bp.route('/players/cache-stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    """Statystyki cache odpowiedzi (trafienia, chybienia, zajętość)"""
+    try:
+        return jsonify(response_cache.stats())
+    except Exception as e:
+        return jsonify({'error': 'Błąd serwera'}), 500
@@ -0,0 +1,103 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select
+from src.models.user import db
+from src.models.player import Player
+from src.models.player_archive import PlayerArchive
+from src.models.counter import Counter
+from src.utils.changes import ARCHIVED_SEQUENCE
+from src.utils.response_cache import response_cache
+
+# Po ilu dniach od usunięcia wpis trafia do archiwum
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '30'))
+
+# Liczba wierszy przenoszonych w jednej transakcji
+ARCHIVE_BATCH_SIZE = 1000
+
+ARCHIVE_COLUMNS = ('nickname', 'nickname_key', 'reason', 'reported_by', 'created_at', 'updated_at', 'change_seq')
+
+def _archivable(cutoff, max_id):
+    """Warunek wpisów do archiwizacji"""
+    # Wiersz o najwyższym id zostaje - SQLite bez AUTOINCREMENT nadałby jego id ponownie
+    return (Player.is_active == False, Player.updated_at < cutoff, Player.id < max_id)
+
+def _archive_batch(cutoff, max_id, batch_size, now):
+    """Przenosi jedną partię - INSERT ... SELECT i DELETE w jednej transakcji zapisu"""
+    batch = select(Player.id).where(*_archivable(cutoff, max_id)).order_by(Player.id).limit(batch_size)
+    ids = db.session.scalars(batch).all()
+    if not ids:
+        return 0
+
+    # Warunek powtórzony w zapisie - wpis mógł zostać przywrócony po odczycie listy id
+    selected = (Player.id.in_(ids),) + _archivable(cutoff, max_id)
+    db.session.execute(insert(PlayerArchive).from_select(
+        ['player_id', *ARCHIVE_COLUMNS, 'archived_at'],
+        select(Player.id, *[getattr(Player, name) for name in ARCHIVE_COLUMNS], literal(now)).where(*selected)
+    ))
+    highest = db.session.execute(select(func.max(Player.change_seq)).where(*selected)).scalar()
+    archived = db.session.execute(delete(Player).where(*selected)).rowcount
+    if highest is not None:
+        Counter.raise_to(ARCHIVED_SEQUENCE, highest)
+    db.session.commit()
+    return archived
+
+def archive_inactive_players(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Przenosi graczy usuniętych dawniej niż older_than_days dni do tabeli players_archive
+
+    Każda partia to osobna transakcja - aplikacja może w tym czasie zapisywać.
+
+    Returns:
+        int: Liczba przeniesionych wpisów
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    max_id = db.session.execute(select(func.max(Player.id))).scalar()
+    if max_id is None:
+        return 0
+
+    now = datetime.utcnow()
+    total = 0
+    while True:
+        archived = _archive_batch(cutoff, max_id, batch_size, now)
+        if not archived:
+            break
+        total += archived
+
+    if total:
+        # Z kanału zmian zniknęły usunięcia - odpowiedzi w cache są nieaktualne
+        response_cache.bump_generation()
+    return total
+
+def compact_database():
+    """
+    Zwalnia miejsce po przeniesionych wierszach i odświeża statystyki planera
+
+    SQLite: baza bez auto_vacuum=INCREMENTAL jest jednorazowo przełączana pełnym VACUUM
+    (blokuje zapisy na czas przebudowy pliku), kolejne uruchomienia zwalniają tylko
+    wolne strony przez PRAGMA incremental_vacuum.
+
+    Returns:
+        dict: Tryb VACUUM ('full', 'incremental' lub None) i liczba zwolnionych stron
+    """
+    # Połączenie zapisujące musi być wolne - sesja oddaje je do puli
+    db.session.remove()
+
+    with db.engine.connect() as conn:
+        if db.engine.dialect.name != 'sqlite':
+            conn.exec_driver_sql('ANALYZE')
+            conn.commit()
+            return {'vacuum': None, 'freed_pages': 0}
+
+        free_pages = conn.exec_driver_sql('PRAGMA freelist_count').scalar()
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+            conn.exec_driver_sql('PRAGMA auto_vacuum=INCREMENTAL')
+            conn.exec_driver_sql('VACUUM')
+            mode = 'full'
+        else:
+            # sqlite3.execute() wykonuje tylko pierwszy krok tej instrukcji (zwalnia jedną stronę) -
+            # executescript() wykonuje ją do końca
+            conn.connection.dbapi_connection.executescript('PRAGMA incremental_vacuum;')
+            mode = 'incremental'
+        conn.exec_driver_sql('ANALYZE')
+        conn.commit()
+    return {'vacuum': mode, 'freed_pages': free_pages}
@@ -0,0 +1,177 @@
+import json
+import os
+import queue
+import threading
+import time
+from src.models.user import db
+from src.models.counter import Counter
+from src.utils.database import use_reader
+from src.utils.changes import CHANGE_SEQUENCE, change_to_dict, fetch_changes, requires_full_resync
+from src.utils.response_cache import response_cache
+
+def format_event(change):
+    """Formatuje zmianę jako zdarzenie Server-Sent Events"""
+    data = json.dumps(change, ensure_ascii=False, separators=(',', ':'))
+    return f"id: {change['seq']}\nevent: {change['op']}\ndata: {data}\n\n"
+
+class Subscription:
+    """Kolejka zdarzeń jednego połączenia /players/stream"""
+
+    def __init__(self, start_seq, queue_size):
+        self.start_seq = start_seq
+        self.events = queue.Queue(maxsize=queue_size)
+        self.overflowed = False
+
+    def push(self, seq, event):
+        try:
+            self.events.put_nowait((seq, event))
+        except queue.Full:
+            # Klient nie nadąża - połączenie zostanie zamknięte, wznowi od Last-Event-ID
+            self.overflowed = True
+
+class ChangeStream:
+    """
+    Rozsyłanie zmian listy graczy do połączeń Server-Sent Events
+
+    Jeden wątek na proces czyta kanał zmian (players.change_seq) i rozdaje gotowe
+    zdarzenia do kolejek wszystkich subskrybentów - baza jest odpytywana raz na
+    zmianę, a nie raz na połączenie. Zapisy tego procesu budzą wątek od razu przez
+    notify(), zapisy innych workerów wykrywane są po zmianie generacji danych.
+    """
+
+    POLL_INTERVAL = 1.0
+    HEARTBEAT_SECONDS = 15
+    RETRY_MILLISECONDS = 3000
+    # Po tym czasie połączenie jest zamykane - klient wznawia od Last-Event-ID, a wątek workera się zwalnia
+    MAX_STREAM_SECONDS = 300
+    QUEUE_SIZE = 1000
+    BATCH_SIZE = 500
+    MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', '48'))
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._subscribers = set()
+        self._pid = None
+        self._app = None
+        self._last_seq = 0
+
+    def _ensure_dispatcher(self, app):
+        """Uruchamia wątek rozsyłający w bieżącym procesie (wątki nie przeżywają fork())"""
+        if self._pid == os.getpid():
+            return
+        self._app = app
+        self._subscribers = set()
+        with app.app_context():
+            self._last_seq = Counter.get_value(CHANGE_SEQUENCE)
+        self._pid = os.getpid()
+        threading.Thread(target=self._run, name='players-change-stream', daemon=True).start()
+
+    def subscribe(self, app):
+        """
+        Rejestruje nowe połączenie
+
+        Returns:
+            Subscription: Subskrypcja lub None gdy osiągnięto limit połączeń
+        """
+        # Serwer API (gunicorn.conf.py) nie przyjmuje strumieni - zająłby nimi workery sync
+        if not self.MAX_SUBSCRIBERS:
+            return None
+        with self._lock:
+            self._ensure_dispatcher(app)
+            if len(self._subscribers) >= self.MAX_SUBSCRIBERS:
+                return None
+            subscription = Subscription(self._last_seq, self.QUEUE_SIZE)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def _replay(self, since, until):
+        """Zdarzenia z bazy dla wznowienia połączenia: numery zmian z przedziału (since, until]"""
+        while since < until:
+            players, has_more = fetch_changes(since, self.BATCH_SIZE)
+            pending = [player for player in players if player.change_seq <= until]
+            for player in pending:
+                yield format_event(change_to_dict(player))
+            if not has_more or len(pending) < len(players):
+                return
+            since = pending[-1].change_seq
+
+    def stream(self, subscription, last_event_id=None):
+        """
+        Generator treści odpowiedzi text/event-stream dla subskrypcji
+
+        Args:
+            subscription (Subscription): Subskrypcja z subscribe()
+            last_event_id (int): Numer ostatniej zmiany otrzymanej przez klienta
+        """
+        try:
+            yield f"retry: {self.RETRY_MILLISECONDS}\n\n"
+            
+            if last_event_id is not None and requires_full_resync(last_event_id):
+                # Brakujących usunięć nie ma już w kanale - klient pobiera listę od nowa,
+                # id zdarzenia przesuwa jego Last-Event-ID na bieżący numer
+                yield f"id: {subscription.start_seq}\nevent: resync\ndata: {{}}\n\n"
+                last_event_id = subscription.start_seq
+                db.session.remove()
+            elif last_event_id is not None and last_event_id < subscription.start_seq:
+                yield from self._replay(last_event_id, subscription.start_seq)
+                # Nie trzymamy otwartej transakcji odczytu przez cały czas połączenia
+                db.session.remove()
+            
+            deadline = time.monotonic() + self.MAX_STREAM_SECONDS
+            while time.monotonic() < deadline and not subscription.overflowed:
+                try:
+                    seq, event = subscription.events.get(timeout=self.HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                if last_event_id is None or seq > last_event_id:
+                    yield event
+        finally:
+            self.unsubscribe(subscription)
+
+    def notify(self):
+        """Budzi wątek rozsyłający po zapisie w tym procesie"""
+        self._wakeup.set()
+
+    def _run(self):
+        generation = None
+        while True:
+            self._wakeup.wait(self.POLL_INTERVAL)
+            woken = self._wakeup.is_set()
+            self._wakeup.clear()
+
+            try:
+                current = response_cache.get_generation('players')
+                if not woken and current == generation:
+                    continue
+                generation = current
+                self._dispatch()
+            except Exception as e:
+                print(f"Błąd podczas rozsyłania zmian listy graczy: {e}")
+
+    def _dispatch(self):
+        with self._app.app_context():
+            # Wątek tylko czyta - nie zajmuje jedynego połączenia zapisującego workera
+            use_reader(db.session)
+            has_more = True
+            while has_more:
+                players, has_more = fetch_changes(self._last_seq, self.BATCH_SIZE)
+                if not players:
+                    return
+                # Zdarzenie serializowane raz, niezależnie od liczby subskrybentów
+                events = []
+                if self._subscribers:
+                    events = [(player.change_seq, format_event(change_to_dict(player))) for player in players]
+                with self._lock:
+                    for subscription in self._subscribers:
+                        for seq, event in events:
+                            subscription.push(seq, event)
+                    self._last_seq = players[-1].change_seq
+
+# Globalna instancja
+change_stream = ChangeStream()
@@ -0,0 +1,75 @@
+from sqlalchemy import func
+from src.models.user import db
+from src.models.player import Player
+from src.models.counter import Counter
+
+# Licznik numerów zmian na liście graczy (players.change_seq)
+CHANGE_SEQUENCE = 'players_change_seq'
+# Najwyższy numer zmiany wśród wpisów przeniesionych do archiwum (manage.py archive)
+ARCHIVED_SEQUENCE = 'players_archived_seq'
+
+DEFAULT_CHANGES_LIMIT = 500
+MAX_CHANGES_LIMIT = 1000
+
+def ensure_change_feed():
+    """Nadaje numery zmian wierszom sprzed wprowadzenia change_seq i ustawia licznik"""
+    missing = db.session.query(func.count(Player.id)).filter(Player.change_seq.is_(None)).scalar()
+    if missing:
+        # Kolejność według id - dla starych wierszy to kolejność dodania
+        offset = Counter.get_value(CHANGE_SEQUENCE)
+        # updated_at podane wprost - inaczej onupdate nadpisałby datę ostatniej edycji
+        db.session.query(Player).filter(Player.change_seq.is_(None)).update(
+            {Player.change_seq: Player.id + offset, Player.updated_at: Player.updated_at},
+            synchronize_session=False
+        )
+
+    highest = db.session.query(func.max(Player.change_seq)).scalar() or 0
+    counter = db.session.get(Counter, CHANGE_SEQUENCE)
+    if counter is None:
+        db.session.add(Counter(name=CHANGE_SEQUENCE, value=highest))
+    elif counter.value < highest:
+        counter.value = highest
+    db.session.commit()
+
+def fetch_changes(since, limit=DEFAULT_CHANGES_LIMIT):
+    """
+    Pobiera graczy zmienionych po numerze since
+
+    Każdy gracz występuje raz, z ostatnim stanem - nieaktywny wpis to "tombstone".
+
+    Returns:
+        tuple: (lista graczy w kolejności change_seq, czy są kolejne zmiany)
+    """
+    players = (
+        Player.query
+        .filter(Player.change_seq > since)
+        .order_by(Player.change_seq)
+        .limit(limit + 1)
+        .all()
+    )
+    return players[:limit], len(players) > limit
+
+def requires_full_resync(since):
+    """
+    Czy klient z kopią listy do numeru since musi pobrać ją od nowa
+
+    Usunięcia przeniesione do archiwum znikają z kanału zmian - klient, który ich
+    nie otrzymał, nie może uzupełnić kopii samymi zmianami.
+    """
+    return 0 < since < Counter.get_value(ARCHIVED_SEQUENCE)
+
+def change_to_dict(player):
+    """Serializuje zmianę dla klienta synchronizującego listę"""
+    if not player.is_active:
+        return {
+            'seq': player.change_seq,
+            'op': 'delete',
+            'id': player.id,
+            'nickname': player.nickname
+        }
+    return {
+        'seq': player.change_seq,
+        'op': 'upsert',
+        'id': player.id,
+        'player': player.to_dict()
+    }
@@ -0,0 +1,135 @@
+import os
+from flask import has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.elements import TextClause
+
+# Domyślna baza - plik w src/database
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'app.db')}"
+
+# Klucz SQLALCHEMY_BINDS dla połączeń tylko do odczytu
+READER_BIND = 'reader'
+
+# Ustawienia SQLite nadawane każdemu nowemu połączeniu
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+# Wartość ujemna to rozmiar w KiB (domyślnie 64 MiB na połączenie)
+SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', '-65536'))
+
+# Połączenia do odczytu na workera - z zapasem dla wielu wątków (serwer deweloperski, worker gevent strumienia)
+DATABASE_READER_POOL_SIZE = int(os.environ.get('DATABASE_READER_POOL_SIZE', '8'))
+DATABASE_READER_MAX_OVERFLOW = int(os.environ.get('DATABASE_READER_MAX_OVERFLOW', '64'))
+# Jak długo wątek czeka na jedyne połączenie zapisujące (sekundy)
+DATABASE_WRITER_POOL_TIMEOUT = int(os.environ.get('DATABASE_WRITER_POOL_TIMEOUT', '10'))
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+def _sqlite_pragmas(read_only):
+    """Instrukcje PRAGMA dla nowego połączenia SQLite"""
+    pragmas = [
+        f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}',
+        'PRAGMA synchronous=NORMAL',
+        f'PRAGMA mmap_size={SQLITE_MMAP_SIZE}',
+        f'PRAGMA cache_size={SQLITE_CACHE_SIZE}',
+    ]
+    if read_only:
+        pragmas.append('PRAGMA query_only=ON')
+    else:
+        # Tryb dziennika jest zapisywany w pliku bazy - wystarczy ustawić go z połączenia zapisującego.
+        # auto_vacuum działa tylko w nowej bazie, istniejącą przełącza manage.py archive
+        pragmas[:0] = ['PRAGMA auto_vacuum=INCREMENTAL', 'PRAGMA journal_mode=WAL']
+    return pragmas
+
+def _is_file_sqlite(url):
+    url = make_url(url)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def configure_database(app):
+    """
+    Ustawia bazę danych aplikacji przed db.init_app()
+
+    URL z DATABASE_URL (domyślnie plik src/database/app.db). Dla SQLite w pliku:
+    zapisy przechodzą przez jedno połączenie na workera (kolejka w puli zamiast
+    "database is locked"), a żądania GET używają osobnej puli połączeń tylko do
+    odczytu - w trybie WAL odczyty nie czekają na zapis.
+    """
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+
+    if not _is_file_sqlite(url):
+        return
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': 1,
+        'max_overflow': 0,
+        'pool_timeout': DATABASE_WRITER_POOL_TIMEOUT
+    }
+    app.config['SQLALCHEMY_BINDS'] = {
+        READER_BIND: {
+            'url': url,
+            'pool_size': DATABASE_READER_POOL_SIZE,
+            'max_overflow': DATABASE_READER_MAX_OVERFLOW
+        }
+    }
+
+def init_engines(db):
+    """Rejestruje ustawienia połączeń SQLite - wywoływane w kontekście aplikacji po db.init_app()"""
+    for key, engine in db.engines.items():
+        if engine.dialect.name != 'sqlite':
+            continue
+        pragmas = _sqlite_pragmas(read_only=key == READER_BIND)
+
+        @event.listens_for(engine, 'connect')
+        def _on_connect(dbapi_connection, connection_record, pragmas=pragmas):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    # Gunicorn z preload_app=True forkuje workery - połączeń procesu nadrzędnego nie wolno
+    # używać w potomnych, każdy worker otwiera własne
+    engines = list(db.engines.values())
+    os.register_at_fork(after_in_child=lambda: [engine.dispose(close=False) for engine in engines])
+
+def use_reader(session):
+    """Kieruje odczyty sesji poza żądaniem HTTP (np. wątek tła) do połączeń tylko do odczytu"""
+    session.info[READER_BIND] = True
+
+def _is_write(clause):
+    """Czy instrukcja może zapisywać - tekstowy SQL traktowany ostrożnie jako zapis"""
+    if clause is None:
+        return False
+    if isinstance(clause, TextClause) or getattr(clause, 'is_dml', False):
+        return True
+    # select(Model).from_statement(update(...).returning(...))
+    return getattr(getattr(clause, 'element', None), 'is_dml', False)
+
+class RoutingSession(Session):
+    """
+    Sesja wybierająca połączenie według rodzaju żądania
+
+    Żądania GET czytają z puli tylko do odczytu. W pozostałych żądaniach odczyty też
+    idą do tej puli aż do pierwszego zapisu - potem cała sesja używa połączenia
+    zapisującego, żeby widzieć własne niezatwierdzone zmiany. Poza żądaniem (start
+    aplikacji, CLI, wątki tła) domyślnie używane jest połączenie zapisujące.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and READER_BIND in self._db.engines and self._use_reader(clause):
+            return self._db.engines[READER_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_reader(self, clause):
+        if self.info.get(READER_BIND):
+            return True
+        if not has_request_context():
+            return False
+        if request.method in READ_METHODS:
+            return True
+        if self.info.get('writing'):
+            return False
+        if self._flushing or _is_write(clause):
+            self.info['writing'] = True
+            return False
+        return True
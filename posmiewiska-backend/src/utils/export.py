@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from src.models.user import db
+from src.models.player import Player
+
+# Format eksportu -> typ MIME
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+EXPORT_STATUSES = ('active', 'inactive', 'all')
+
+EXPORT_COLUMNS = ('id', 'nickname', 'reason', 'reported_by', 'created_at', 'updated_at', 'is_active')
+
+# Ile wierszy pobierać z bazy naraz i ile łączyć w jeden fragment odpowiedzi
+CHUNK_ROWS = 1000
+
+def build_export_query(status='active', reported_by=None, created_from=None, created_to=None):
+    """
+    Buduje zapytanie eksportu z filtrami
+
+    Args:
+        status (str): 'active', 'inactive' lub 'all'
+        reported_by (str): Tylko wpisy tego zgłaszającego
+        created_from (datetime): Dodane od (włącznie)
+        created_to (datetime): Dodane przed (bez tej chwili)
+    """
+    columns = [getattr(Player, name) for name in EXPORT_COLUMNS]
+    query = select(*columns).order_by(Player.id)
+
+    if status == 'active':
+        query = query.where(Player.is_active == True)
+    elif status == 'inactive':
+        query = query.where(Player.is_active == False)
+
+    if reported_by:
+        query = query.where(Player.reported_by == reported_by)
+    if created_from:
+        query = query.where(Player.created_at >= created_from)
+    if created_to:
+        query = query.where(Player.created_at < created_to)
+
+    return query
+
+def _iter_rows(query):
+    """Wiersze pobierane partiami - pamięć nie rośnie z rozmiarem listy"""
+    result = db.session.execute(query.execution_options(yield_per=CHUNK_ROWS))
+    for partition in result.partitions():
+        yield partition
+
+def _serialize(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+def _ndjson_chunks(query):
+    for partition in _iter_rows(query):
+        lines = [
+            json.dumps(
+                {name: _serialize(value) for name, value in zip(EXPORT_COLUMNS, row)},
+                ensure_ascii=False, separators=(',', ':')
+            )
+            for row in partition
+        ]
+        yield '\n'.join(lines) + '\n'
+
+def _csv_chunks(query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for partition in _iter_rows(query):
+        writer.writerows([_serialize(value) for value in row] for row in partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _gzip_chunks(chunks):
+    """Kompresja gzip w locie - bez składania całego pliku w pamięci"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def generate_export(query, export_format='ndjson', compress=False):
+    """
+    Treść eksportu jako strumień fragmentów
+
+    Args:
+        query: Zapytanie z build_export_query()
+        export_format (str): 'ndjson' lub 'csv'
+        compress (bool): Czy kompresować gzipem
+
+    Returns:
+        iterator: Kolejne fragmenty odpowiedzi (str lub bytes przy kompresji)
+    """
+    chunks = _csv_chunks(query) if export_format == 'csv' else _ndjson_chunks(query)
+    if compress:
+        return _gzip_chunks(chunks)
+    return chunks
@@ -0,0 +1,205 @@
+import csv
+import json
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from src.models.user import db
+from src.models.player import Player, normalize_nickname
+from src.models.counter import Counter
+from src.utils.change_stream import change_stream
+from src.utils.changes import CHANGE_SEQUENCE
+from src.utils.response_cache import response_cache
+from src.utils.player_writes import upsert_params, upsert_statement
+from src.utils.search import reindex_players
+
+IMPORT_FORMATS = ('ndjson', 'csv')
+IMPORT_CONFLICT_MODES = ('skip', 'update')
+
+# Liczba wierszy zapisywanych w jednej transakcji
+IMPORT_BATCH_SIZE = 1000
+
+# Limity importu przez API - większe pliki importuje się poleceniem manage.py import
+IMPORT_MAX_BYTES = 10 * 1024 * 1024
+IMPORT_MAX_ROWS = 10000
+
+def iter_import_rows(stream, import_format='ndjson'):
+    """
+    Czyta wiersze importu ze strumienia tekstowego
+
+    Yields:
+        tuple: (numer wiersza, słownik z danymi lub None, komunikat błędu lub None)
+    """
+    if import_format == 'csv':
+        reader = csv.DictReader(stream)
+        # Numer wiersza pliku - nagłówek to wiersz 1
+        for row_number, row in enumerate(reader, start=2):
+            yield row_number, row, None
+        return
+
+    for row_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            yield row_number, None, 'Nieprawidłowy JSON'
+            continue
+        if not isinstance(data, dict):
+            yield row_number, None, 'Wiersz musi być obiektem JSON'
+            continue
+        yield row_number, data, None
+
+class PlayerImporter:
+    """
+    Import wielu graczy naraz - zapis partiami po IMPORT_BATCH_SIZE wierszy
+
+    Każda partia to jedna transakcja: jedno zapytanie o istniejące nicki (do raportu),
+    jeden INSERT ... ON CONFLICT dla wszystkich wierszy (executemany), numery zmian
+    zarezerwowane jednym UPDATE licznika i przeindeksowanie wyszukiwarki.
+    """
+
+    def __init__(self, on_conflict='skip', default_reported_by=None, batch_size=IMPORT_BATCH_SIZE):
+        self.on_conflict = on_conflict
+        self.default_reported_by = default_reported_by
+        self.batch_size = batch_size
+        self.rows = []
+        self.summary = {}
+        self.changed_ids = []
+        self._seen = set()
+        self._statement = None
+
+    def _report(self, row_number, nickname, status, error=None, player_id=None):
+        entry = {'row': row_number, 'nickname': nickname, 'status': status}
+        if player_id is not None:
+            entry['id'] = player_id
+        if error:
+            entry['error'] = error
+        self.rows.append(entry)
+        self.summary[status] = self.summary.get(status, 0) + 1
+
+    def _report_skipped(self, skipped):
+        for row_number, nickname, player_id in skipped:
+            self._report(row_number, nickname, 'skipped', 'Gracz już znajduje się na liście', player_id)
+
+    def _validate(self, row_number, data):
+        """Zwraca (nickname, reason, reported_by) lub None - błędy trafiają do raportu"""
+        # Import dopiero tutaj - moduł jest używany przez blueprint graczy
+        from src.routes.players import sanitize_input, validate_minecraft_nickname
+
+        nickname = sanitize_input(data.get('nickname', ''))
+        reason = sanitize_input(data.get('reason', ''))
+        reported_by = sanitize_input(data.get('reported_by', '') or self.default_reported_by or '')
+
+        if not validate_minecraft_nickname(nickname):
+            self._report(row_number, nickname, 'invalid', 'Nieprawidłowy nick Minecraft')
+        elif not reason or len(reason) < 10:
+            self._report(row_number, nickname, 'invalid', 'Powód musi mieć co najmniej 10 znaków')
+        elif not reported_by or len(reported_by) < 3:
+            self._report(row_number, nickname, 'invalid', 'Pole "zgłaszający" jest wymagane')
+        elif normalize_nickname(nickname) in self._seen:
+            self._report(row_number, nickname, 'duplicate', 'Nick powtarza się w imporcie')
+        else:
+            self._seen.add(normalize_nickname(nickname))
+            return nickname, reason, reported_by
+        return None
+
+    def _write_batch(self, batch):
+        valid = []
+        for row_number, data, error in batch:
+            if error:
+                self._report(row_number, None, 'invalid', error)
+                continue
+            fields = self._validate(row_number, data)
+            if fields:
+                valid.append((row_number,) + fields)
+
+        if not valid:
+            return
+
+        skipped = []
+        try:
+            # Aktywny wpis ma pierwszeństwo przed usuniętymi o tym samym nicku
+            existing = {}
+            for player_id, nickname_key, is_active in db.session.execute(
+                select(Player.id, Player.nickname_key, Player.is_active)
+                .where(Player.nickname_key.in_([normalize_nickname(row[1]) for row in valid]))
+                .order_by(Player.is_active, Player.id)
+            ):
+                existing[nickname_key] = (player_id, is_active)
+
+            writes = []
+            for row_number, nickname, reason, reported_by in valid:
+                player_id, is_active = existing.get(normalize_nickname(nickname), (None, None))
+                if player_id is None:
+                    status = 'created'
+                elif not is_active:
+                    status = 'restored'
+                elif self.on_conflict == 'update':
+                    status = 'updated'
+                else:
+                    skipped.append((row_number, nickname, player_id))
+                    continue
+                writes.append((row_number, nickname, reason, reported_by, status))
+
+            if not writes:
+                db.session.rollback()
+                self._report_skipped(skipped)
+                return
+
+            # Jeden UPDATE licznika rezerwuje numery zmian dla całej partii
+            last_seq = Counter.increment(CHANGE_SEQUENCE, len(writes))
+            now = datetime.utcnow()
+            if self._statement is None:
+                self._statement = upsert_statement(replace_active=self.on_conflict == 'update')
+            db.session.execute(self._statement, [
+                upsert_params(nickname, reason, reported_by, last_seq - len(writes) + index + 1, now)
+                for index, (row_number, nickname, reason, reported_by, status) in enumerate(writes)
+            ])
+
+            ids = dict(db.session.execute(
+                select(Player.nickname_key, Player.id).where(
+                    Player.nickname_key.in_([normalize_nickname(write[1]) for write in writes]),
+                    Player.is_active == True
+                )
+            ).all())
+            reindex_players(list(ids.values()))
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            skipped_rows = {row[0] for row in skipped}
+            for row_number, nickname, reason, reported_by in valid:
+                if row_number not in skipped_rows:
+                    self._report(row_number, nickname, 'error', 'Błąd zapisu')
+            self._report_skipped(skipped)
+            return
+
+        self._report_skipped(skipped)
+        for row_number, nickname, reason, reported_by, status in writes:
+            player_id = ids.get(normalize_nickname(nickname))
+            self._report(row_number, nickname, status, player_id=player_id)
+            self.changed_ids.append(player_id)
+
+    def run(self, rows):
+        """
+        Importuje wiersze z iter_import_rows()
+
+        Returns:
+            dict: Podsumowanie (liczba wierszy według statusu) i raport dla każdego wiersza
+        """
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._write_batch(batch)
+                batch = []
+        if batch:
+            self._write_batch(batch)
+
+        if self.changed_ids:
+            # Jedno unieważnienie cache na cały import - pozostałe workery doczytają zmiany po change_seq
+            response_cache.bump_generation()
+            change_stream.notify()
+
+        self.rows.sort(key=lambda entry: entry['row'])
+        return {'summary': self.summary, 'rows': self.rows}
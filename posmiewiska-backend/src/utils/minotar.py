@@ -1,38 +1,422 @@
 import requests
+import hashlib
 import os
-from datetime import datetime, timedelta
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+from contextlib import contextmanager
 from urllib.parse import quote
+from requests.adapters import HTTPAdapter
+from src.utils import png, skin_renderer
+from src.utils.sqlite_store import LocalConnection
+
+try:
+    import fcntl
+except ImportError:  # Windows - blokada między procesami niedostępna
+    fcntl = None
+
+class SingleFlight:
+    """Scala równoległe wywołania dla tego samego klucza w jedno wykonanie"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+    
+    def do(self, key, fn):
+        """
+        Wykonuje fn() - wątki czekające na ten sam klucz dostają wynik pierwszego wywołania
+        
+        Args:
+            key: Klucz operacji
+            fn (callable): Operacja do wykonania
+            
+        Returns:
+            Wynik fn()
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None}
+                self._calls[key] = call
+        
+        if not leader:
+            call['done'].wait()
+            return call['result']
+        
+        try:
+            call['result'] = fn()
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call['done'].set()
+        
+        return call['result']
+
+class CircuitBreaker:
+    """
+    Bezpiecznik dla zapytań do zewnętrznej usługi
+
+    Po serii błędów przechodzi w stan otwarty i od razu odrzuca zapytania. Po upływie
+    reset_timeout przepuszcza jedno zapytanie próbne (stan półotwarty) - jego sukces
+    zamyka bezpiecznik, porażka otwiera go ponownie.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+    
+    @property
+    def state(self):
+        return self._state
+    
+    def allow_request(self):
+        """Sprawdza czy zapytanie może zostać wykonane"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            
+            # W stanie półotwartym przepuszczamy tylko jedno zapytanie próbne
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
 
 class MinotarAPI:
     """Klasa do obsługi Minotar API z buforowaniem awatarów"""
     
     BASE_URL = "https://minotar.net"
     CACHE_DIR = "avatar_cache"
-    CACHE_DURATION_HOURS = 24  # Czas buforowania awatarów w godzinach
+    CACHE_DURATION_HOURS = int(os.environ.get('MINOTAR_CACHE_HOURS', 24))  # Czas buforowania awatarów w godzinach
+    CACHE_MAX_BYTES = int(os.environ.get('MINOTAR_CACHE_MAX_MB', 512)) * 1024 * 1024  # Limit rozmiaru cache
+    CACHE_MAX_ENTRIES = int(os.environ.get('MINOTAR_CACHE_MAX_ENTRIES', 50000))  # Limit liczby plików
+    ACCESS_UPDATE_SECONDS = 60  # Co ile najczęściej odświeżać czas użycia wpisu (LRU)
+    STALE_MAX_HOURS = 24 * 7  # Jak długo po wygaśnięciu serwować stary obrazek, odświeżając go w tle
+    REFRESH_WORKERS = 2  # Liczba wątków odświeżających wygasłe obrazki w tle
+    PREFETCH_WORKERS = 8  # Liczba równoległych pobrań przy rozgrzewaniu cache
+    # Połączenia keep-alive dla pobrań w wątkach obsługujących żądania (awatary, skiny)
+    REQUEST_CONNECTIONS = int(os.environ.get('MINOTAR_REQUEST_CONNECTIONS', 16))
+    REQUEST_TIMEOUT = (3, 10)  # Limit czasu połączenia i odczytu odpowiedzi Minotar w sekundach
+    NEGATIVE_CACHE_MINUTES = 30  # Jak długo nie odpytywać Minotar o nick, dla którego pobranie się nie udało
+    BREAKER_FAILURE_THRESHOLD = 5  # Liczba kolejnych błędów otwierających bezpiecznik
+    BREAKER_RESET_SECONDS = 30  # Po ilu sekundach bezpiecznik wpuszcza zapytanie próbne
+    DEFAULT_AVATAR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'steve.png')
+    DEFAULT_AVATAR_SIZE = 64  # Rozmiar obrazka DEFAULT_AVATAR_PATH
+    DEFAULT_AVATARS_DIR = 'default'  # Podkatalog cache z domyślnym awatarem w pozostałych rozmiarach
+    AVATAR_KINDS = ('avatar', 'helm', 'body')
+    SKIN_KIND = 'skin'  # Surowy skin 64x64, z którego renderowane są pozostałe obrazki
+    # Czy renderować awatary lokalnie ze skina (jedno pobranie z Minotar na gracza)
+    LOCAL_RENDER = os.environ.get('MINOTAR_LOCAL_RENDER', 'true').lower() in ('1', 'true', 'yes')
+    VALID_SIZES = (8, 16, 32, 64, 128, 256, 512)
+    LOCAL_URL_PREFIX = "/api/avatars"
+    LOCK_SLOTS = 1024  # Liczba blokad między procesami (zakresów bajtów w pliku .lock)
     
     def __init__(self, cache_dir=None):
         self.cache_dir = cache_dir or self.CACHE_DIR
         self._ensure_cache_dir()
+        self._single_flight = SingleFlight()
+        # Indeks cache - zastępuje stat() na plikach i przeglądanie katalogu
+        self._index = LocalConnection(os.path.join(self.cache_dir, 'index.db'), schema=(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, '
+            'fetched_at REAL NOT NULL, last_access REAL NOT NULL, '
+            'etag TEXT, last_modified TEXT)',
+            'CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)',
+            'CREATE INDEX IF NOT EXISTS ix_entries_fetched_at ON entries (fetched_at)',
+            'CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+            'CREATE TABLE IF NOT EXISTS failures ('
+            'nickname TEXT PRIMARY KEY, reason TEXT NOT NULL, expires_at REAL NOT NULL)',
+            'CREATE TABLE IF NOT EXISTS tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))',
+            'CREATE INDEX IF NOT EXISTS ix_tags_key ON tags (key)'
+        ), columns={
+            'entries': {'etag': 'TEXT', 'last_modified': 'TEXT'}
+        })
+        self._refresh_lock = threading.Lock()
+        self._refreshing = set()
+        self._breaker = CircuitBreaker(self.BREAKER_FAILURE_THRESHOLD, self.BREAKER_RESET_SECONDS)
+        self._process_resources = {}
+        self._process_resources_pid = None
+        self._process_resources_lock = threading.Lock()
     
     def _ensure_cache_dir(self):
         """Tworzy katalog cache jeśli nie istnieje"""
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir)
     
-    def _get_cache_path(self, nickname, size):
-        """Zwraca ścieżkę do pliku cache dla danego nicku i rozmiaru"""
+    def _cache_key(self, nickname, kind, size):
+        """Zwraca klucz wpisu w indeksie cache"""
+        return f"{kind}/{nickname.lower()}/{size}"
+    
+    def _get_cache_path(self, nickname, size, kind='avatar'):
+        """
+        Zwraca względną ścieżkę do pliku cache dla danego nicku, rodzaju i rozmiaru
+
+        Pliki są rozkładane na 256 podkatalogów według skrótu klucza,
+        żeby żaden katalog nie trzymał dziesiątek tysięcy plików.
+        """
         safe_nickname = quote(nickname.lower(), safe='')
-        return os.path.join(self.cache_dir, f"{safe_nickname}_{size}.png")
+        return self._shard_path(self._cache_key(nickname, kind, size), f"{safe_nickname}_{kind}_{size}.png")
+    
+    def _shard_path(self, key, filename):
+        """Zwraca względną ścieżkę pliku w podkatalogu wyznaczonym przez skrót klucza"""
+        shard = hashlib.sha1(key.encode('utf-8')).hexdigest()[:2]
+        return os.path.join(shard, filename)
     
-    def _is_cache_valid(self, cache_path):
-        """Sprawdza czy plik cache jest nadal ważny"""
-        if not os.path.exists(cache_path):
+    @contextmanager
+    def _process_lock(self, key):
+        """Blokada między workerami dla danego klucza (blokada zakresu bajtów w pliku .lock)"""
+        if fcntl is None:
+            yield
+            return
+        
+        slot = zlib.crc32(key.encode('utf-8')) % self.LOCK_SLOTS
+        with open(os.path.join(self.cache_dir, '.lock'), 'a+b') as lock_file:
+            fcntl.lockf(lock_file, fcntl.LOCK_EX, 1, slot)
+            try:
+                yield
+            finally:
+                fcntl.lockf(lock_file, fcntl.LOCK_UN, 1, slot)
+    
+    def _lookup(self, key):
+        """
+        Odczytuje wpis z indeksu cache
+        
+        Returns:
+            dict: Ścieżka do pliku, wiek wpisu w sekundach i walidatory Minotar
+                (etag, last_modified) lub None jeśli wpisu nie ma
+        """
+        try:
+            conn = self._index.get()
+            row = conn.execute(
+                'SELECT path, fetched_at, last_access, etag, last_modified FROM entries WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            
+            path, fetched_at, last_access, etag, last_modified = row
+            now = time.time()
+            
+            # Przybliżone LRU - bez zapisu do indeksu przy każdym odczycie
+            if now - last_access >= self.ACCESS_UPDATE_SECONDS:
+                conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            
+            return {
+                'path': os.path.join(self.cache_dir, path),
+                'age': now - fetched_at,
+                'etag': etag,
+                'last_modified': last_modified
+            }
+        except sqlite3.Error:
+            return None
+    
+    def _is_known_failure(self, nickname):
+        """Sprawdza czy nick jest w negatywnym cache (ostatnie pobranie się nie udało)"""
+        try:
+            row = self._index.get().execute(
+                'SELECT expires_at FROM failures WHERE nickname = ?', (nickname.lower(),)
+            ).fetchone()
+            return row is not None and row[0] > time.time()
+        except sqlite3.Error:
             return False
+    
+    def _remember_failure(self, nickname, reason):
+        """Zapisuje nick w negatywnym cache na NEGATIVE_CACHE_MINUTES"""
+        try:
+            self._index.get().execute(
+                'INSERT OR REPLACE INTO failures (nickname, reason, expires_at) VALUES (?, ?, ?)',
+                (nickname.lower(), reason, time.time() + self.NEGATIVE_CACHE_MINUTES * 60)
+            )
+        except sqlite3.Error:
+            pass
+    
+    def _forget_failure(self, nickname):
+        try:
+            self._index.get().execute('DELETE FROM failures WHERE nickname = ?', (nickname.lower(),))
+        except sqlite3.Error:
+            pass
+    
+    def is_default_avatar(self, path):
+        """Sprawdza czy ścieżka wskazuje domyślny obrazek (serwowany, gdy Minotar nie odpowiada)"""
+        if path == self.DEFAULT_AVATAR_PATH:
+            return True
+        return path is not None and os.path.dirname(path) == os.path.join(self.cache_dir, self.DEFAULT_AVATARS_DIR)
+    
+    def default_avatar(self, size=64):
+        """
+        Domyślny awatar w zadanym rozmiarze
+        
+        Obrazek jest skalowany raz na rozmiar i zapisywany w katalogu cache poza
+        indeksem - nie podlega limitom ani czyszczeniu cache.
+        
+        Returns:
+            str: Ścieżka do pliku (przy błędzie zapisu - obrazek w rozmiarze oryginalnym)
+        """
+        if size == self.DEFAULT_AVATAR_SIZE or size not in self.VALID_SIZES:
+            return self.DEFAULT_AVATAR_PATH
+        
+        path = os.path.join(self.cache_dir, self.DEFAULT_AVATARS_DIR, f"steve_{size}.png")
+        if os.path.exists(path):
+            return path
+        
+        try:
+            with open(self.DEFAULT_AVATAR_PATH, 'rb') as f:
+                width, height, rows = png.decode(f.read())
+            self._write_file(path, png.encode(size, size, skin_renderer.scale(rows, width, height, size, size)))
+        except (OSError, ValueError) as e:
+            print(f"Błąd podczas skalowania domyślnego awatara do {size}px: {e}")
+            return self.DEFAULT_AVATAR_PATH
+        return path
+    
+    def _is_fresh(self, entry):
+        """Sprawdza czy wpis cache nie wygasł"""
+        return entry is not None and entry['age'] < self.CACHE_DURATION_HOURS * 3600
+    
+    def _is_servable_stale(self, entry):
+        """Sprawdza czy wygasły wpis można jeszcze serwować podczas odświeżania w tle"""
+        return entry is not None and entry['age'] < (self.CACHE_DURATION_HOURS + self.STALE_MAX_HOURS) * 3600
+    
+    def _increment_stat(self, conn, name, amount):
+        conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+    
+    def _record_entry(self, key, path, size, etag=None, last_modified=None):
+        """Zapisuje wpis w indeksie i usuwa najdawniej używane wpisy ponad limit"""
+        now = time.time()
+        conn = self._index.get()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            previous = conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, path, size, fetched_at, last_access, etag, last_modified) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (key, path, size, now, now, etag, last_modified)
+            )
+            if previous:
+                self._increment_stat(conn, 'bytes', size - previous[0])
+            else:
+                self._increment_stat(conn, 'entries', 1)
+                self._increment_stat(conn, 'bytes', size)
+            
+            self._evict(conn)
+    
+    def _evict(self, conn):
+        """Usuwa najdawniej używane wpisy aż cache zmieści się w limicie bajtów i plików (LRU)"""
+        stats = dict(conn.execute("SELECT name, value FROM stats WHERE name IN ('entries', 'bytes')").fetchall())
+        entries = stats.get('entries', 0)
+        total_bytes = stats.get('bytes', 0)
+        if entries <= self.CACHE_MAX_ENTRIES and total_bytes <= self.CACHE_MAX_BYTES:
+            return
+        
+        victims = []
+        for key, path, size in conn.execute('SELECT key, path, size FROM entries ORDER BY last_access'):
+            if entries <= self.CACHE_MAX_ENTRIES and total_bytes <= self.CACHE_MAX_BYTES:
+                break
+            victims.append((key, path))
+            entries -= 1
+            total_bytes -= size
+        
+        self._remove_entries(conn, victims)
+        self._increment_stat(conn, 'evictions', len(victims))
+    
+    def _remove_entries(self, conn, entries):
+        """Usuwa wpisy z indeksu i ich pliki z dysku"""
+        for key, path in entries:
+            conn.execute('DELETE FROM tags WHERE key = ?', (key,))
+            row = conn.execute('DELETE FROM entries WHERE key = ? RETURNING size', (key,)).fetchone()
+            if row:
+                self._increment_stat(conn, 'entries', -1)
+                self._increment_stat(conn, 'bytes', -row[0])
+            try:
+                os.remove(os.path.join(self.cache_dir, path))
+            except OSError:
+                pass
+    
+    def get_url(self, nickname, kind='avatar', size=64):
+        """
+        Zwraca URL Minotar dla danego rodzaju obrazka
         
-        file_time = datetime.fromtimestamp(os.path.getmtime(cache_path))
-        expiry_time = file_time + timedelta(hours=self.CACHE_DURATION_HOURS)
+        Args:
+            nickname (str): Nick gracza Minecraft
+            kind (str): Rodzaj obrazka (avatar, helm, body)
+            size (int): Rozmiar obrazka
+            
+        Returns:
+            str: URL do obrazka
+        """
+        if kind == 'helm':
+            return self.get_helm_url(nickname, size)
+        if kind == 'body':
+            return self.get_body_url(nickname, size)
+        if kind == self.SKIN_KIND:
+            return self.get_skin_url(nickname)
+        return self.get_avatar_url(nickname, size)
+    
+    def get_skin_url(self, nickname):
+        """
+        Zwraca URL do surowego skina gracza
         
-        return datetime.now() < expiry_time
+        Args:
+            nickname (str): Nick gracza Minecraft
+            
+        Returns:
+            str: URL do pliku PNG ze skinem
+        """
+        nickname = self._sanitize_nickname(nickname) or "steve"
+        return f"{self.BASE_URL}/skin/{nickname}"
+    
+    def get_local_url(self, nickname, kind='avatar', size=64):
+        """
+        Zwraca URL do obrazka serwowanego przez lokalny endpoint /api/avatars
+        
+        Args:
+            nickname (str): Nick gracza Minecraft
+            kind (str): Rodzaj obrazka (avatar, helm, body)
+            size (int): Rozmiar obrazka
+            
+        Returns:
+            str: Lokalny URL do obrazka
+        """
+        if kind not in self.AVATAR_KINDS:
+            kind = 'avatar'
+        if size not in self.VALID_SIZES:
+            size = 64
+        
+        nickname = self._sanitize_nickname(nickname) or "steve"
+        return f"{self.LOCAL_URL_PREFIX}/{nickname}/{kind}/{size}"
     
     def get_avatar_url(self, nickname, size=64):
         """
@@ -99,43 +483,408 @@ class MinotarAPI:
         
         return f"{self.BASE_URL}/body/{nickname}/{size}"
     
-    def download_avatar(self, nickname, size=64, use_cache=True):
+    def download_avatar(self, nickname, size=64, use_cache=True, kind='avatar', fallback=False):
         """
         Pobiera awatar gracza i zapisuje w cache
         
+        Przy włączonym LOCAL_RENDER obrazek jest renderowany lokalnie ze skina gracza,
+        pobieranego z Minotar raz dla wszystkich rodzajów i rozmiarów. Równoległe
+        pobrania tego samego obrazka (wątki i workery) są scalane w jedno zapytanie.
+        Nicki, dla których pobranie się nie udało, nie są odpytywane ponownie
+        przez NEGATIVE_CACHE_MINUTES.
+        
         Args:
             nickname (str): Nick gracza Minecraft
             size (int): Rozmiar awatara
             use_cache (bool): Czy używać cache
+            kind (str): Rodzaj obrazka (avatar, helm, body)
+            fallback (bool): Czy w razie błędu zwrócić starą wersję z cache
+                lub domyślny obrazek zamiast None
             
         Returns:
             str: Ścieżka do pobranego pliku lub None w przypadku błędu
         """
         nickname = self._sanitize_nickname(nickname)
-        if not nickname:
-            return None
+        if not nickname or kind not in self.AVATAR_KINDS:
+            return self.default_avatar(size) if fallback else None
         
-        cache_path = self._get_cache_path(nickname, size)
+        path = None
+        if self.LOCAL_RENDER:
+            path = self._render_from_skin(nickname, kind, size, use_cache)
+        if path is None:
+            path = self._download(nickname, kind, size, use_cache)
+        
+        if path is None and fallback:
+            return self.fallback_avatar(nickname, size, kind)
+        
+        return path
+    
+    def fallback_avatar(self, nickname, size=64, kind='avatar'):
+        """Zastępczy obrazek, gdy pobranie się nie udało - stara wersja z cache lub domyślny awatar"""
+        nickname = self._sanitize_nickname(nickname)
+        if not nickname or kind not in self.AVATAR_KINDS:
+            return self.default_avatar(size)
+        
+        # Nawet bardzo stara wersja jest lepsza niż domyślny obrazek
+        entry = self._lookup(self._cache_key(nickname, kind, size))
+        return entry['path'] if entry else self.default_avatar(size)
+    
+    def _download(self, nickname, kind, size, use_cache):
+        """Zwraca obrazek z cache lub pobiera go z Minotar"""
+        key = self._cache_key(nickname, kind, size)
         
         # Sprawdzenie cache
-        if use_cache and self._is_cache_valid(cache_path):
-            return cache_path
+        if use_cache:
+            entry = self._lookup(key)
+            if self._is_fresh(entry):
+                return entry['path']
+            
+            # Wygasły obrazek serwujemy od razu, a nową wersję pobieramy w tle
+            if self._is_servable_stale(entry):
+                self._schedule_refresh(nickname, size, kind)
+                return entry['path']
+            
+            if self._is_known_failure(nickname):
+                return None
+        
+        def fetch():
+            with self._process_lock(key):
+                # Inny worker mógł pobrać obrazek, gdy czekaliśmy na blokadę
+                current = self._lookup(key)
+                if use_cache and self._is_fresh(current):
+                    return current['path']
+                return self._fetch_to_cache(nickname, size, kind, current)
+        
+        return self._single_flight.do(key, fetch)
+    
+    def _render_key(self, nickname, kind, size):
+        return self._cache_key(nickname, f"render-{kind}", size)
+    
+    def _render_from_skin(self, nickname, kind, size, use_cache):
+        """
+        Zwraca obrazek wyrenderowany ze skina gracza
+        
+        Wyrenderowane obrazki są ważne tak długo jak skin - przy pobraniu
+        nowej wersji skina są usuwane z cache.
+        
+        Returns:
+            str: Ścieżka do pliku lub None, gdy skina nie udało się pobrać lub odczytać
+        """
+        render_key = self._render_key(nickname, kind, size)
+        skin_path = self._download(nickname, self.SKIN_KIND, 64, use_cache)
+        
+        entry = self._lookup(render_key)
+        if entry:
+            return entry['path']
+        if not skin_path:
+            return None
+        
+        def render():
+            with self._process_lock(render_key):
+                current = self._lookup(render_key)
+                if current:
+                    return current['path']
+                
+                try:
+                    with open(skin_path, 'rb') as f:
+                        image = skin_renderer.render(f.read(), kind, size)
+                except (OSError, ValueError) as e:
+                    print(f"Błąd podczas renderowania awatara dla {nickname}: {e}")
+                    return None
+                
+                relative_path = self._get_cache_path(nickname, size, f"render-{kind}")
+                return self._store_file(render_key, relative_path, image)
+        
+        return self._single_flight.do(render_key, render)
+    
+    def _drop_renders(self, nickname):
+        """Usuwa z cache obrazki wyrenderowane ze starej wersji skina"""
+        conn = self._index.get()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for kind in self.AVATAR_KINDS:
+                prefix = self._render_key(nickname, kind, '')
+                # Zakres kluczy "render-kind/nick/..." - '0' to znak następny po '/'
+                entries = conn.execute(
+                    'SELECT key, path FROM entries WHERE key > ? AND key < ?',
+                    (prefix, prefix[:-1] + '0')
+                ).fetchall()
+                self._remove_entries(conn, entries)
+    
+    def _per_process(self, name, factory):
+        """
+        Zwraca zasób tworzony leniwie osobno w każdym procesie
+
+        Wątki puli i połączenia sesji HTTP nie przeżywają fork() - workery gunicorna
+        (preload_app=True) muszą utworzyć własne.
+        """
+        with self._process_resources_lock:
+            if self._process_resources_pid != os.getpid():
+                self._process_resources = {}
+                self._process_resources_pid = os.getpid()
+            if name not in self._process_resources:
+                self._process_resources[name] = factory()
+            return self._process_resources[name]
+    
+    def _get_refresh_executor(self):
+        """Pula wątków odświeżających wygasłe obrazki w tle"""
+        return self._per_process('refresh_executor', lambda: ThreadPoolExecutor(
+            max_workers=self.REFRESH_WORKERS, thread_name_prefix='minotar-refresh'
+        ))
+    
+    def _get_prefetch_executor(self):
+        """Pula wątków rozgrzewających cache"""
+        return self._per_process('prefetch_executor', lambda: ThreadPoolExecutor(
+            max_workers=self.PREFETCH_WORKERS, thread_name_prefix='minotar-prefetch'
+        ))
+    
+    def _get_session(self):
+        """Współdzielona sesja HTTP z pulą połączeń keep-alive do Minotar"""
+        def create_session():
+            session = requests.Session()
+            # Pule w tle i wątki żądań - bez zapasu nadmiarowe połączenia byłyby zamykane po użyciu
+            pool_size = self.PREFETCH_WORKERS + self.REFRESH_WORKERS + self.REQUEST_CONNECTIONS
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            return session
+        return self._per_process('session', create_session)
+    
+    def _schedule_refresh(self, nickname, size, kind):
+        """Zleca odświeżenie wygasłego obrazka w tle (najwyżej jedno na klucz w procesie)"""
+        key = self._cache_key(nickname, kind, size)
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._get_refresh_executor().submit(self._refresh, nickname, size, kind)
+    
+    def _refresh(self, nickname, size, kind):
+        """Odświeża wygasły obrazek zapytaniem warunkowym do Minotar"""
+        key = self._cache_key(nickname, kind, size)
+        try:
+            with self._process_lock(key):
+                entry = self._lookup(key)
+                # Inny worker mógł już odświeżyć obrazek
+                if not self._is_fresh(entry):
+                    self._fetch_to_cache(nickname, size, kind, entry)
+        finally:
+            with self._refresh_lock:
+                self._refreshing.discard(key)
+    
+    def _touch_entry(self, key):
+        """Oznacza wpis jako świeży bez pobierania obrazka (Minotar odpowiedział 304)"""
+        now = time.time()
+        self._index.get().execute(
+            'UPDATE entries SET fetched_at = ?, last_access = ? WHERE key = ?', (now, now, key)
+        )
+    
+    def _fetch_to_cache(self, nickname, size, kind, entry=None):
+        """
+        Pobiera obrazek z Minotar i atomowo zapisuje go w cache
+        
+        Jeśli obrazek jest już w cache, zapytanie jest warunkowe (If-None-Match /
+        If-Modified-Since) - niezmieniony skin kosztuje tylko odpowiedź 304.
+        """
+        key = self._cache_key(nickname, kind, size)
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        # Minotar nie odpowiada - nie blokujemy workera kolejnym zapytaniem
+        if not self._breaker.allow_request():
+            return None
         
         try:
-            # Pobieranie awatara
-            url = self.get_avatar_url(nickname, size)
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            url = self.get_url(nickname, kind, size)
+            response = self._get_session().get(url, headers=headers, timeout=self.REQUEST_TIMEOUT)
+            
+            if entry and response.status_code == 304:
+                self._breaker.record_success()
+                self._touch_entry(key)
+                return entry['path']
             
-            # Zapisanie do cache
-            with open(cache_path, 'wb') as f:
-                f.write(response.content)
+            # Nieznany nick - Minotar działa, ale obrazka nie ma
+            if response.status_code in (400, 404):
+                self._breaker.record_success()
+                self._remember_failure(nickname, 'not_found')
+                return None
             
+            response.raise_for_status()
+            self._breaker.record_success()
+            self._forget_failure(nickname)
+            
+            cache_path = self._store_file(
+                key, self._get_cache_path(nickname, size, kind), response.content,
+                etag=response.headers.get('ETag'),
+                last_modified=response.headers.get('Last-Modified')
+            )
+            if kind == self.SKIN_KIND:
+                self._drop_renders(nickname)
+            # Arkusze z poprzednią wersją obrazka (albo z obrazkiem zastępczym) są nieaktualne
+            self.cache_drop_tag(self.nickname_tag(nickname))
             return cache_path
             
         except requests.RequestException as e:
             print(f"Błąd podczas pobierania awatara dla {nickname}: {e}")
+            self._breaker.record_failure()
+            self._remember_failure(nickname, 'error')
+            return None
+        except (OSError, sqlite3.Error) as e:
+            print(f"Błąd zapisu awatara {nickname} do cache: {e}")
+            return None
+    
+    def _write_file(self, path, content):
+        """Zapis do pliku tymczasowego i podmiana - czytelnicy nie zobaczą niepełnego pliku"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    
+    def _store_file(self, key, relative_path, content, etag=None, last_modified=None):
+        """Atomowo zapisuje obrazek w cache i rejestruje go w indeksie"""
+        cache_path = os.path.join(self.cache_dir, relative_path)
+        self._write_file(cache_path, content)
+        
+        self._record_entry(key, relative_path, len(content), etag=etag, last_modified=last_modified)
+        return cache_path
+    
+    def cache_get(self, key, max_age=None):
+        """
+        Zwraca wpis zapisany w cache przez cache_put
+        
+        Args:
+            key (str): Klucz wpisu
+            max_age (float): Maksymalny wiek wpisu w sekundach (None - bez limitu)
+            
+        Returns:
+            dict: Ścieżka do pliku ('path') i jego ETag ('etag') lub None
+        """
+        entry = self._lookup(key)
+        if entry is None or (max_age is not None and entry['age'] > max_age):
             return None
+        return {'path': entry['path'], 'etag': entry['etag']}
+    
+    def nickname_tag(self, nickname):
+        """Etykieta wpisów cache_put zbudowanych z obrazków gracza - usuwana po pobraniu nowej wersji"""
+        return f"nickname:{nickname.lower()}"
+    
+    def cache_put(self, key, name, content, tags=(), etag=None):
+        """
+        Zapisuje w cache plik wygenerowany przez aplikację (np. arkusz sprite'ów)
+        
+        Plik podlega tym samym limitom rozmiaru i usuwaniu LRU co awatary.
+        
+        Args:
+            key (str): Klucz wpisu
+            name (str): Nazwa pliku (bez rozszerzenia)
+            content (bytes): Zawartość pliku PNG
+            tags (iterable): Etykiety, po których można później usunąć wpis (cache_drop_tag)
+            etag (str): ETag pliku zwracany przez cache_get
+            
+        Returns:
+            str: Ścieżka do zapisanego pliku
+        """
+        path = self._store_file(key, self._shard_path(key, f"{name}.png"), content, etag=etag)
+        conn = self._index.get()
+        with conn:
+            conn.executemany(
+                'INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)', [(tag, key) for tag in tags]
+            )
+        return path
+    
+    def cache_drop_tag(self, tag):
+        """Usuwa z cache wszystkie wpisy oznaczone daną etykietą"""
+        try:
+            conn = self._index.get()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                entries = conn.execute(
+                    'SELECT entries.key, entries.path FROM tags '
+                    'JOIN entries ON entries.key = tags.key WHERE tags.tag = ?',
+                    (tag,)
+                ).fetchall()
+                self._remove_entries(conn, entries)
+                conn.execute('DELETE FROM tags WHERE tag = ?', (tag,))
+        except sqlite3.Error as e:
+            print(f"Błąd podczas usuwania wpisów cache ({tag}): {e}")
+    
+    def prefetch(self, nicknames, sizes=(64,), kinds=('avatar',), wait=True, timeout=None):
+        """
+        Rozgrzewa cache dla wielu graczy naraz - równolegle, na ograniczonej puli wątków
+        
+        Args:
+            nicknames (iterable): Nicki graczy Minecraft
+            sizes (iterable): Rozmiary obrazków
+            kinds (iterable): Rodzaje obrazków (avatar, helm, body)
+            wait (bool): Czy czekać na zakończenie pobierania
+            timeout (float): Najdłuższy czas czekania w sekundach - niedokończone pobrania
+                działają dalej w tle
+            
+        Returns:
+            list: Wynik dla każdego unikalnego obrazka (nickname, kind, size, status, path);
+                status to cached, fetched, error, pending (przekroczony timeout) lub invalid.
+                Bez czekania - pusta lista.
+        """
+        results = []
+        jobs = {}
+        
+        for raw_nickname in nicknames:
+            nickname = self._sanitize_nickname(raw_nickname)
+            for kind in kinds:
+                for size in sizes:
+                    if not nickname or kind not in self.AVATAR_KINDS or size not in self.VALID_SIZES:
+                        results.append({
+                            'nickname': raw_nickname, 'kind': kind, 'size': size,
+                            'status': 'invalid', 'path': None
+                        })
+                        continue
+                    
+                    key = self._cache_key(nickname, kind, size)
+                    if key not in jobs:
+                        jobs[key] = (nickname, kind, size)
+        
+        executor = self._get_prefetch_executor()
+        futures = {
+            key: executor.submit(self._prefetch_one, nickname, size, kind)
+            for key, (nickname, kind, size) in jobs.items()
+        }
+        
+        if not wait:
+            return []
+        
+        wait_futures(futures.values(), timeout=timeout)
+        for key, future in futures.items():
+            nickname, kind, size = jobs[key]
+            if not future.done():
+                results.append({'nickname': nickname, 'kind': kind, 'size': size, 'status': 'pending', 'path': None})
+                continue
+            try:
+                status, path = future.result()
+            except Exception as e:
+                print(f"Błąd podczas rozgrzewania cache dla {nickname}: {e}")
+                status, path = 'error', None
+            results.append({'nickname': nickname, 'kind': kind, 'size': size, 'status': status, 'path': path})
+        
+        return results
+    
+    def _prefetch_one(self, nickname, size, kind):
+        """Pobiera jeden obrazek do cache, jeśli nie ma w nim świeżej wersji"""
+        if self.LOCAL_RENDER:
+            entry = self._lookup(self._render_key(nickname, kind, size))
+            if entry:
+                return 'cached', entry['path']
+        
+        entry = self._lookup(self._cache_key(nickname, kind, size))
+        if self._is_fresh(entry):
+            return 'cached', entry['path']
+        
+        path = self.download_avatar(nickname, size, kind=kind)
+        return ('fetched', path) if path else ('error', None)
     
     def _sanitize_nickname(self, nickname):
         """
@@ -183,26 +932,38 @@ class MinotarAPI:
         Args:
             older_than_hours (int): Usuwa pliki starsze niż podana liczba godzin
         """
-        if not os.path.exists(self.cache_dir):
-            return
+        cutoff = time.time() - older_than_hours * 3600 if older_than_hours else None
         
-        now = datetime.now()
+        try:
+            conn = self._index.get()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                if cutoff is None:
+                    entries = conn.execute('SELECT key, path FROM entries').fetchall()
+                else:
+                    entries = conn.execute(
+                        'SELECT key, path FROM entries WHERE fetched_at < ?', (cutoff,)
+                    ).fetchall()
+                self._remove_entries(conn, entries)
+        except sqlite3.Error as e:
+            print(f"Błąd podczas czyszczenia cache awatarów: {e}")
+    
+    def cache_stats(self):
+        """
+        Zwraca statystyki zajętości cache
         
-        for filename in os.listdir(self.cache_dir):
-            file_path = os.path.join(self.cache_dir, filename)
-            
-            if not os.path.isfile(file_path):
-                continue
-            
-            if older_than_hours:
-                file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                if (now - file_time).total_seconds() < older_than_hours * 3600:
-                    continue
-            
-            try:
-                os.remove(file_path)
-            except OSError:
-                pass
+        Returns:
+            dict: Liczba wpisów, zajęte bajty, limity i liczba usuniętych wpisów
+        """
+        stats = dict(self._index.get().execute('SELECT name, value FROM stats').fetchall())
+        return {
+            'entries': stats.get('entries', 0),
+            'bytes': stats.get('bytes', 0),
+            'max_entries': self.CACHE_MAX_ENTRIES,
+            'max_bytes': self.CACHE_MAX_BYTES,
+            'evictions': stats.get('evictions', 0),
+            'circuit_breaker': self._breaker.state
+        }
 
 # Globalna instancja dla łatwego użycia
 minotar = MinotarAPI()
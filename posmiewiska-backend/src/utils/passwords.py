@@ -0,0 +1,188 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows - limit między procesami niedostępny
+    fcntl = None
+
+class PasswordHasherBusy(Exception):
+    """Kolejka haszowania haseł jest pełna - żądanie należy odrzucić kodem 503"""
+
+class PasswordHasher:
+    """
+    Haszowanie i weryfikacja haseł poza wątkiem obsługującym żądanie
+
+    KDF Werkzeuga jest celowo wolny. Obliczenia trafiają do puli procesów, a liczba
+    jednoczesnych obliczeń jest ograniczona w całym serwerze (blokady zakresu bajtów
+    w pliku .lock), więc kilka prób logowania nie zajmie wszystkich workerów gunicorna.
+    Gdy miejsca w kolejce brak, zgłaszany jest PasswordHasherBusy zamiast czekania.
+    """
+
+    DEFAULT_LOCK_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'password_hash.lock')
+    METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    POOL_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '1'))
+    CONCURRENCY = int(os.environ.get('PASSWORD_HASH_CONCURRENCY', '1'))  # na cały serwer
+    QUEUE_LIMIT = int(os.environ.get('PASSWORD_HASH_QUEUE', '1'))  # oczekujących, na cały serwer
+    # Miejsca w kolejce leżą w tym samym pliku .lock, za miejscami obliczeniowymi
+    QUEUE_OFFSET = 1024
+    # Oczekujący trzyma worker gunicorna - czeka najwyżej tyle, ile trwa jedno haszowanie
+    QUEUE_WAIT_SECONDS = 0.2
+    POLL_INTERVAL = 0.01
+    TASK_TIMEOUT = 15
+    # fork() procesu z wieloma wątkami (pule Minotar, strumień zmian) może zostawić w procesie
+    # potomnym blokady zajęte przez inne wątki (logging, import) - procesy puli startują
+    # z czystego interpretera
+    START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+    def __init__(self, method=None, lock_path=None):
+        self.method = method or self.METHOD
+        self.lock_path = lock_path or os.environ.get('PASSWORD_HASH_LOCK', self.DEFAULT_LOCK_PATH)
+        self._slots_lock = threading.Lock()
+        self._held_slots = set()
+        self._lock_file = None
+        self._lock_file_pid = None
+        self._pool_lock = threading.Lock()
+        self._pool = None
+        self._pool_pid = None
+
+    def _get_pool(self):
+        """Pula procesów tworzona leniwie w każdym workerze (nie przeżywa fork())"""
+        with self._pool_lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # Procesy puli wykonują tylko funkcje z werkzeug.security - niczego
+                # nie dziedziczą po workerze
+                self._pool = ProcessPoolExecutor(
+                    max_workers=max(1, self.POOL_WORKERS),
+                    mp_context=multiprocessing.get_context(self.START_METHOD)
+                )
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def _reset_pool(self):
+        with self._pool_lock:
+            if self._pool is not None and self._pool_pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _get_lock_file(self):
+        """
+        Plik blokad otwierany raz na proces
+
+        Zamknięcie dowolnego deskryptora pliku zwalnia wszystkie blokady fcntl procesu
+        na tym pliku - wątki nie mogą więc otwierać i zamykać go osobno.
+        Wywoływane pod _slots_lock.
+        """
+        if fcntl is None:
+            return None
+        if self._lock_file is None or self._lock_file_pid != os.getpid():
+            self._held_slots = set()
+            self._lock_file = open(self.lock_path, 'a+b')
+            self._lock_file_pid = os.getpid()
+        return self._lock_file
+
+    def _try_slot(self, offset, count):
+        """Próbuje bez czekania zająć jedno z miejsc offset..offset+count-1 - zwraca je lub None"""
+        with self._slots_lock:
+            lock_file = self._get_lock_file()
+            for slot in range(offset, offset + max(1, count)):
+                # Blokady fcntl należą do procesu - wątki tego samego procesu rozróżniamy sami
+                if slot in self._held_slots:
+                    continue
+                if lock_file is not None:
+                    try:
+                        fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                    except OSError:
+                        continue
+                self._held_slots.add(slot)
+                return slot
+        return None
+
+    def _release_slot(self, slot):
+        with self._slots_lock:
+            if self._lock_file is not None and self._lock_file_pid == os.getpid():
+                fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, slot)
+            self._held_slots.discard(slot)
+
+    @contextmanager
+    def _slot(self):
+        """
+        Miejsce obliczeniowe - PasswordHasherBusy gdy kolejka jest pełna
+
+        Kolejka obejmuje cały serwer (CONCURRENCY liczących + QUEUE_LIMIT czekających)
+        i jest zajmowana bez czekania - pełna oznacza natychmiastowe 503.
+        """
+        queued = self._try_slot(self.QUEUE_OFFSET, self.CONCURRENCY + max(0, self.QUEUE_LIMIT))
+        if queued is None:
+            raise PasswordHasherBusy()
+
+        try:
+            deadline = time.monotonic() + self.QUEUE_WAIT_SECONDS
+            slot = self._try_slot(0, self.CONCURRENCY)
+            while slot is None:
+                if time.monotonic() >= deadline:
+                    raise PasswordHasherBusy()
+                time.sleep(self.POLL_INTERVAL)
+                slot = self._try_slot(0, self.CONCURRENCY)
+
+            try:
+                yield
+            finally:
+                self._release_slot(slot)
+        finally:
+            self._release_slot(queued)
+
+    def _run(self, fn, *args):
+        with self._slot():
+            try:
+                return self._get_pool().submit(fn, *args).result(timeout=self.TASK_TIMEOUT)
+            except FutureTimeoutError:
+                raise PasswordHasherBusy()
+            except BrokenProcessPool:
+                # Proces puli padł (np. OOM) - następne wywołanie utworzy nową pulę
+                self._reset_pool()
+                raise PasswordHasherBusy()
+
+    def hash(self, password):
+        """
+        Hashuje hasło skonfigurowaną metodą
+
+        Raises:
+            PasswordHasherBusy: Gdy kolejka haszowania jest pełna
+        """
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """
+        Sprawdza hasło z zapisanym hashem
+
+        Raises:
+            PasswordHasherBusy: Gdy kolejka haszowania jest pełna
+        """
+        return self._run(check_password_hash, password_hash, password)
+
+    def _normalized_method(self, method):
+        """Rozwija domyślne parametry Werkzeuga, np. 'scrypt' -> 'scrypt:32768:8:1'"""
+        parts = method.split(':')
+        if parts[0] == 'scrypt':
+            defaults = ['32768', '8', '1']
+            return ':'.join(['scrypt'] + parts[1:] + defaults[len(parts) - 1:])
+        if parts[0] == 'pbkdf2':
+            defaults = ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)]
+            return ':'.join(['pbkdf2'] + parts[1:] + defaults[len(parts) - 1:])
+        return method
+
+    def needs_rehash(self, password_hash):
+        """Sprawdza czy hash powstał innymi parametrami niż obecnie skonfigurowane"""
+        stored_method = (password_hash or '').split('$', 1)[0]
+        return self._normalized_method(stored_method) != self._normalized_method(self.method)
+
+# Globalna instancja
+password_hasher = PasswordHasher()
@@ -0,0 +1,111 @@
+from sqlalchemy import text
+from src.models.user import db
+from src.models.player import Player
+from src.models.counter import Counter
+
+# Liczniki w tabeli counters utrzymywane przez wyzwalacze na tabeli players
+ACTIVE_COUNTER = 'players_active'
+INACTIVE_COUNTER = 'players_inactive'
+# Aktywne wpisy danego zgłaszającego: 'players_reported_by:<zgłaszający>'
+REPORTER_COUNTER_PREFIX = 'players_reported_by:'
+
+# Powyżej tylu wyników wyszukiwania liczba jest tylko szacowana (bez pełnego skanu)
+SEARCH_COUNT_LIMIT = 1000
+
+_STATUS_COUNTER = f"CASE WHEN {{row}}.is_active = 1 THEN '{ACTIVE_COUNTER}' ELSE '{INACTIVE_COUNTER}' END"
+_REPORTER_COUNTER = f"'{REPORTER_COUNTER_PREFIX}' || {{row}}.reported_by"
+
+def _add(counter, amount, condition):
+    """Instrukcja wyzwalacza zmieniająca licznik (tworzy go jeśli nie istnieje)"""
+    return (
+        f"INSERT INTO counters (name, value) SELECT {counter}, {amount} WHERE {condition} "
+        f"ON CONFLICT (name) DO UPDATE SET value = value + excluded.value;"
+    )
+
+_CHANGED_STATUS = '(OLD.is_active = 1) IS NOT (NEW.is_active = 1)'
+_CHANGED_REPORTER = '(OLD.is_active = 1 OR NEW.is_active = 1) AND (' \
+    '(OLD.is_active = 1) IS NOT (NEW.is_active = 1) OR OLD.reported_by IS NOT NEW.reported_by)'
+
+# Wyzwalacze działają w transakcji zapisu - liczniki są zawsze zgodne z tabelą,
+# niezależnie od ścieżki zapisu (pojedyncze zapytania, upsert, import, operacje grupowe)
+COUNT_TRIGGERS = {
+    'players_counts_insert': 'AFTER INSERT ON players BEGIN ' + ' '.join([
+        _add(_STATUS_COUNTER.format(row='NEW'), 1, '1'),
+        _add(_REPORTER_COUNTER.format(row='NEW'), 1, 'NEW.is_active = 1'),
+    ]) + ' END',
+    'players_counts_update': 'AFTER UPDATE OF is_active, reported_by ON players BEGIN ' + ' '.join([
+        _add(_STATUS_COUNTER.format(row='OLD'), -1, _CHANGED_STATUS),
+        _add(_STATUS_COUNTER.format(row='NEW'), 1, _CHANGED_STATUS),
+        _add(_REPORTER_COUNTER.format(row='OLD'), -1, f'OLD.is_active = 1 AND ({_CHANGED_REPORTER})'),
+        _add(_REPORTER_COUNTER.format(row='NEW'), 1, f'NEW.is_active = 1 AND ({_CHANGED_REPORTER})'),
+    ]) + ' END',
+    'players_counts_delete': 'AFTER DELETE ON players BEGIN ' + ' '.join([
+        _add(_STATUS_COUNTER.format(row='OLD'), -1, '1'),
+        _add(_REPORTER_COUNTER.format(row='OLD'), -1, 'OLD.is_active = 1'),
+    ]) + ' END'
+}
+
+_counts_available = False
+
+def ensure_player_counts():
+    """
+    Zakłada wyzwalacze liczników (SQLite) i przelicza liczniki od nowa
+
+    Przeliczenie przy starcie to jeden skan tabeli - naprawia liczniki po zmianach
+    wykonanych z pominięciem wyzwalaczy (np. przebudowa tabeli w ensure_schema()).
+    Inne bazy liczą graczy zapytaniem COUNT(*).
+    """
+    global _counts_available
+
+    if db.engine.dialect.name != 'sqlite':
+        _counts_available = False
+        return
+
+    for name, definition in COUNT_TRIGGERS.items():
+        db.session.execute(text(f'CREATE TRIGGER IF NOT EXISTS {name} {definition}'))
+
+    db.session.execute(
+        text('DELETE FROM counters WHERE name IN (:active, :inactive) OR name LIKE :reporters'),
+        {'active': ACTIVE_COUNTER, 'inactive': INACTIVE_COUNTER, 'reporters': REPORTER_COUNTER_PREFIX + '%'}
+    )
+    db.session.execute(
+        text(
+            'INSERT INTO counters (name, value) '
+            'SELECT :active, count(*) FROM players WHERE is_active = 1 '
+            'UNION ALL SELECT :inactive, count(*) FROM players WHERE is_active IS NOT 1 '
+            'UNION ALL SELECT :prefix || reported_by, count(*) FROM players WHERE is_active = 1 GROUP BY reported_by'
+        ),
+        {'active': ACTIVE_COUNTER, 'inactive': INACTIVE_COUNTER, 'prefix': REPORTER_COUNTER_PREFIX}
+    )
+    db.session.commit()
+    _counts_available = True
+
+def count_players(active=True, reported_by=None):
+    """
+    Liczba graczy z liczników (bez skanowania tabeli)
+
+    Args:
+        active (bool): Aktywni czy usunięci gracze
+        reported_by (str): Tylko aktywni gracze tego zgłaszającego
+    """
+    if not _counts_available:
+        query = Player.query.filter_by(is_active=active)
+        if reported_by:
+            query = query.filter_by(reported_by=reported_by)
+        return query.count()
+
+    if reported_by:
+        return Counter.get_value(REPORTER_COUNTER_PREFIX + reported_by) if active else 0
+    return Counter.get_value(ACTIVE_COUNTER if active else INACTIVE_COUNTER)
+
+def count_search_results(query, limit=SEARCH_COUNT_LIMIT):
+    """
+    Liczba wyników wyszukiwania liczona najwyżej do limitu
+
+    Returns:
+        tuple: (liczba wyników, czy dokładna) - przy przekroczeniu limitu zwraca limit
+    """
+    total = query.order_by(None).limit(limit + 1).count()
+    if total > limit:
+        return limit, False
+    return total, True
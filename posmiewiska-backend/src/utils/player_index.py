@@ -0,0 +1,239 @@
+import bisect
+import os
+import threading
+from sqlalchemy import func
+from src.models.user import db
+from src.models.player import Player, normalize_nickname
+from src.utils.response_cache import response_cache
+from src.utils.similarity import BKTree, nickname_skeleton, search_candidates
+
+class PlayerIndex:
+    """
+    Indeks aktywnych nicków w pamięci procesu (bez rozróżniania wielkości liter)
+
+    Zapisy tego procesu są nanoszone od razu przez apply(). Zapisy innych workerów
+    wykrywane są po zmianie generacji danych 'players' i doczytywane przyrostowo -
+    tylko wiersze z numerem zmiany (change_seq) wyższym niż ostatnio widziany.
+    Posortowana lista kluczy służy do podpowiedzi po prefiksie (bisect), a drzewo BK
+    szkieletów nicków do wyszukiwania podobnych nicków. Drzewo jest budowane przy
+    pierwszym użyciu i przeszukiwane bez blokady - szkielety dodane później trafiają
+    na krótką listę oczekujących, po jej przepełnieniu drzewo budowane jest od nowa.
+    """
+
+    # Powyżej tylu zmian naraz lista kluczy jest sortowana od nowa zamiast wstawiania po jednym
+    RESORT_THRESHOLD = 1000
+    # Powyżej tylu nowych szkieletów spoza drzewa BK jest ono budowane od nowa
+    SIMILAR_PENDING_LIMIT = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_key = {}  # nickname.lower() -> (id, nickname, reason)
+        self._key_by_id = {}  # id -> nickname.lower()
+        self._sorted_keys = []  # klucze _by_key w kolejności alfabetycznej
+        self._skeleton_keys = {}  # szkielet nicku -> zbiór kluczy _by_key
+        self._similar = None  # BKTree szkieletów - niezmienne po zbudowaniu
+        self._similar_pending = set()  # szkielety z _skeleton_keys spoza _similar
+        self._generation = None
+        self._watermark = None
+        self._pid = None
+
+    def _put(self, player_id, nickname, reason, is_active, keep_sorted=True):
+        old_key = self._key_by_id.pop(player_id, None)
+        if old_key is not None and self._by_key.get(old_key, (None,))[0] == player_id:
+            del self._by_key[old_key]
+            if keep_sorted:
+                self._remove_sorted(old_key)
+            self._remove_skeleton(old_key)
+        if is_active:
+            key = normalize_nickname(nickname)
+            if keep_sorted and key not in self._by_key:
+                bisect.insort(self._sorted_keys, key)
+            self._add_skeleton(key)
+            self._by_key[key] = (player_id, nickname, reason)
+            self._key_by_id[player_id] = key
+
+    def _add_skeleton(self, key):
+        skeleton = nickname_skeleton(key)
+        self._skeleton_keys.setdefault(skeleton, set()).add(key)
+        if self._similar is not None and skeleton not in self._similar:
+            self._similar_pending.add(skeleton)
+
+    def _remove_skeleton(self, key):
+        skeleton = nickname_skeleton(key)
+        keys = self._skeleton_keys.get(skeleton)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self._skeleton_keys[skeleton]
+            self._similar_pending.discard(skeleton)
+
+    def _remove_sorted(self, key):
+        position = bisect.bisect_left(self._sorted_keys, key)
+        if position < len(self._sorted_keys) and self._sorted_keys[position] == key:
+            del self._sorted_keys[position]
+
+    def _advance_watermark(self, change_seq):
+        if change_seq is not None and (self._watermark is None or change_seq > self._watermark):
+            self._watermark = change_seq
+
+    def _load(self):
+        """Pełne wczytanie aktywnych graczy"""
+        # Najpierw numer zmiany - wiersze zatwierdzone pomiędzy zapytaniami zostaną doczytane ponownie
+        self._watermark = db.session.query(func.max(Player.change_seq)).scalar()
+        self._by_key = {}
+        self._key_by_id = {}
+        self._skeleton_keys = {}
+        self._similar = None
+        self._similar_pending = set()
+        rows = db.session.query(Player.id, Player.nickname, Player.reason).filter(Player.is_active == True)
+        for player_id, nickname, reason in rows:
+            self._put(player_id, nickname, reason, True, keep_sorted=False)
+        self._sorted_keys = sorted(self._by_key)
+
+    def _load_changes(self):
+        """Doczytuje wiersze zmienione od ostatniej synchronizacji"""
+        query = db.session.query(
+            Player.id, Player.nickname, Player.reason, Player.is_active, Player.change_seq
+        )
+        if self._watermark is not None:
+            query = query.filter(Player.change_seq > self._watermark)
+        rows = query.all()
+        # Duże partie (np. import) - jedno sortowanie zamiast tysięcy wstawień
+        keep_sorted = len(rows) <= self.RESORT_THRESHOLD
+        for player_id, nickname, reason, is_active, change_seq in rows:
+            self._put(player_id, nickname, reason, is_active, keep_sorted)
+            self._advance_watermark(change_seq)
+        if not keep_sorted:
+            self._sorted_keys = sorted(self._by_key)
+            self._similar = None
+            self._similar_pending = set()
+
+    def _sync(self):
+        """Dociąga zmiany innych workerów, jeśli generacja danych się zmieniła"""
+        # Generacja odczytana przed zapytaniem - zapis zatwierdzony w trakcie wymusi kolejną synchronizację
+        generation = response_cache.get_generation('players')
+        if self._pid == os.getpid() and generation == self._generation:
+            return
+
+        if self._pid != os.getpid() or self._generation is None:
+            self._load()
+            self._pid = os.getpid()
+        else:
+            self._load_changes()
+        self._generation = generation
+
+    def apply(self, player, generation=None):
+        """
+        Nanosi zapis wykonany w tym procesie
+
+        Args:
+            player (Player): Zapisany (zatwierdzony) gracz
+            generation (int): Generacja zwrócona przez bump_generation() po zapisie
+        """
+        with self._lock:
+            if self._generation is None:
+                return  # Indeks jeszcze niewczytany - pierwsze zapytanie wczyta wszystko
+            # Bez przesuwania znacznika - zapis innego workera z niższym numerem mógł
+            # zostać zatwierdzony, a jeszcze nie ogłoszony nową generacją
+            self._put(player.id, player.nickname, player.reason, player.is_active)
+            # Nikt inny nie zapisał w międzyczasie - nie trzeba doczytywać zmian
+            if generation is not None and generation == self._generation + 1:
+                self._generation = generation
+
+    def lookup(self, nicknames):
+        """
+        Sprawdza listę nicków
+
+        Returns:
+            dict: Nick z zapytania -> (id, nickname, reason) dla nicków na liście
+        """
+        with self._lock:
+            self._sync()
+            matches = {}
+            for nickname in nicknames:
+                entry = self._by_key.get(normalize_nickname(nickname))
+                if entry is not None:
+                    matches[nickname] = entry
+            return matches
+
+    def suggest(self, prefix, limit=10):
+        """
+        Aktywne nicki zaczynające się od prefiksu (bez rozróżniania wielkości liter)
+
+        Returns:
+            list: Do limit krotek (id, nickname) w kolejności alfabetycznej
+        """
+        key = normalize_nickname(prefix)
+        with self._lock:
+            self._sync()
+            suggestions = []
+            position = bisect.bisect_left(self._sorted_keys, key)
+            for candidate in self._sorted_keys[position:position + limit]:
+                if not candidate.startswith(key):
+                    break
+                player_id, nickname, reason = self._by_key[candidate]
+                suggestions.append((player_id, nickname))
+            return suggestions
+
+    def _similar_snapshot(self):
+        """
+        Drzewo BK i lista oczekujących szkieletów do przeszukania bez blokady
+
+        Drzewo budowane jest poza blokadą z kopii kluczy - szkielety dodane w trakcie
+        budowy trafiają na listę oczekujących przy instalacji.
+        """
+        with self._lock:
+            self._sync()
+            if len(self._similar_pending) > self.SIMILAR_PENDING_LIMIT:
+                self._similar = None
+                self._similar_pending = set()
+            if self._similar is not None:
+                return self._similar, list(self._similar_pending)
+            skeletons = list(self._skeleton_keys)
+
+        tree = BKTree(skeletons)
+        with self._lock:
+            if self._similar is None:
+                self._similar = tree
+                self._similar_pending = {skeleton for skeleton in self._skeleton_keys if skeleton not in tree}
+            return self._similar, list(self._similar_pending)
+
+    def similar(self, nicknames, max_distance=1, limit=10):
+        """
+        Wyszukuje nicki podobne do podanych (odległość edycyjna szkieletów, z zamianą leet)
+
+        Args:
+            nicknames (list): Poprawne nicki Minecraft (validate_minecraft_nickname)
+
+        Returns:
+            dict: Nick z zapytania -> lista krotek (odległość, id, nickname, reason),
+                od najbardziej podobnych, najwyżej limit na nick
+        """
+        tree, pending = self._similar_snapshot()
+
+        # Przeszukiwanie bez blokady - lookup() i suggest() innych wątków nie czekają
+        found_skeletons = {}
+        for nickname in nicknames:
+            skeleton = nickname_skeleton(nickname)
+            found = tree.search(skeleton, max_distance) + search_candidates(skeleton, pending, max_distance)
+            if found:
+                found_skeletons[nickname] = found
+
+        results = {}
+        with self._lock:
+            for nickname, found in found_skeletons.items():
+                matches = sorted(
+                    (distance, key)
+                    for distance, skeleton in found
+                    for key in self._skeleton_keys.get(skeleton, ())
+                )
+                if matches:
+                    results[nickname] = [(distance,) + self._by_key[key] for distance, key in matches[:limit]]
+        return results
+
+    def __len__(self):
+        return len(self._by_key)
+
+# Globalna instancja
+player_index = PlayerIndex()
@@ -0,0 +1,259 @@
+from datetime import datetime
+from sqlalchemy import bindparam, case, func, select, update
+from src.models.user import db
+from src.models.player import Player, normalize_nickname
+from src.models.counter import Counter
+from src.utils.changes import CHANGE_SEQUENCE
+from src.utils.search import index_player, reindex_players
+
+players = Player.__table__
+
+def _dialect_insert():
+    """insert() obsługujący ON CONFLICT dla bieżącej bazy"""
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def is_unique_violation(error):
+    """Czy IntegrityError pochodzi z indeksu unikalnego (nick już na liście), a nie np. z NOT NULL"""
+    orig = getattr(error, 'orig', None)
+    # psycopg2 (pgcode) / psycopg 3 (sqlstate)
+    code = getattr(orig, 'pgcode', None) or getattr(orig, 'sqlstate', None)
+    if code is not None:
+        return code == '23505'
+    name = getattr(orig, 'sqlite_errorname', None)
+    if name is not None:
+        return name in ('SQLITE_CONSTRAINT_UNIQUE', 'SQLITE_CONSTRAINT_PRIMARYKEY')
+    return 'UNIQUE constraint failed' in str(orig)
+
+def _upsert_id(existing):
+    """
+    Id dla upsert_statement() - istniejącego wpisu albo nowe
+
+    SQLite nadaje id samo, gdy podzapytanie zwróci NULL (INTEGER PRIMARY KEY).
+    PostgreSQL odrzuciłby jawny NULL - brak dopasowania dostaje kolejną wartość sekwencji.
+    """
+    existing = existing.limit(1).scalar_subquery()
+    if db.engine.dialect.name == 'postgresql':
+        return func.coalesce(existing, func.nextval(func.pg_get_serial_sequence(players.name, players.c.id.name)))
+    return existing
+
+def upsert_statement(replace_active=False):
+    """
+    INSERT gracza jedną instrukcją, bez wcześniejszego sprawdzania czy nick istnieje
+
+    Podzapytanie wskazuje id istniejącego wpisu o tym samym nicku (bez względu na
+    wielkość liter) - usuniętego, a przy replace_active także aktywnego. Jeśli taki
+    wpis jest, ON CONFLICT (id) nadpisuje go i reaktywuje, w przeciwnym razie powstaje
+    nowy wiersz. Próba dodania drugiego aktywnego wpisu o tym samym nicku kończy się
+    IntegrityError z indeksu ux_players_active_nickname_key.
+
+    Parametry: nickname, nickname_key, reason, reported_by, now, change_seq
+    """
+    existing = select(players.c.id).where(players.c.nickname_key == bindparam('nickname_key'))
+    if replace_active:
+        existing = existing.order_by(players.c.is_active.desc(), players.c.id.desc())
+    else:
+        existing = existing.where(players.c.is_active == False).order_by(players.c.id.desc())
+
+    statement = _dialect_insert()(players).values(
+        id=_upsert_id(existing),
+        nickname=bindparam('nickname'),
+        nickname_key=bindparam('nickname_key'),
+        reason=bindparam('reason'),
+        reported_by=bindparam('reported_by'),
+        created_at=bindparam('now'),
+        updated_at=bindparam('now'),
+        is_active=True,
+        change_seq=bindparam('change_seq')
+    )
+    excluded = statement.excluded
+    return statement.on_conflict_do_update(
+        index_elements=[players.c.id],
+        set_={
+            'nickname': excluded.nickname,
+            'nickname_key': excluded.nickname_key,
+            'reason': excluded.reason,
+            'reported_by': excluded.reported_by,
+            # Przywrócony wpis to nowe zgłoszenie - trafia na początek listy
+            'created_at': case((players.c.is_active == True, players.c.created_at), else_=excluded.created_at),
+            'updated_at': excluded.updated_at,
+            'is_active': True,
+            'change_seq': excluded.change_seq
+        }
+    )
+
+def upsert_params(nickname, reason, reported_by, change_seq, now=None):
+    """Parametry dla upsert_statement()"""
+    return {
+        'nickname': nickname,
+        'nickname_key': normalize_nickname(nickname),
+        'reason': reason,
+        'reported_by': reported_by,
+        'now': now or datetime.utcnow(),
+        'change_seq': change_seq
+    }
+
+def _returning_player(statement, params=None):
+    """Wykonuje instrukcję z RETURNING i zwraca gracza jako obiekt ORM (lub None)"""
+    query = select(Player).from_statement(statement.returning(players)).execution_options(populate_existing=True)
+    return db.session.scalars(query, params or {}).one_or_none()
+
+def create_player(nickname, reason, reported_by):
+    """
+    Dodaje gracza lub reaktywuje jego usunięty wpis - w ramach bieżącej transakcji
+
+    Raises:
+        IntegrityError: Gdy gracz o tym nicku jest już na liście
+    """
+    change_seq = Counter.increment(CHANGE_SEQUENCE)
+    player = _returning_player(upsert_statement(), upsert_params(nickname, reason, reported_by, change_seq))
+    index_player(player)
+    return player
+
+def update_active_player(player_id, values):
+    """
+    Aktualizuje pola aktywnego gracza jednym UPDATE - w ramach bieżącej transakcji
+
+    Args:
+        player_id (int): Id gracza
+        values (dict): Nowe wartości (nickname, reason, reported_by)
+
+    Returns:
+        Player: Zaktualizowany gracz lub None jeśli nie istnieje
+
+    Raises:
+        IntegrityError: Gdy nowy nick jest już zajęty przez innego aktywnego gracza
+    """
+    values = dict(values)
+    if 'nickname' in values:
+        values['nickname_key'] = normalize_nickname(values['nickname'])
+    values['updated_at'] = datetime.utcnow()
+    values['change_seq'] = Counter.increment(CHANGE_SEQUENCE)
+
+    player = _returning_player(
+        update(players).where(players.c.id == player_id, players.c.is_active == True).values(**values)
+    )
+    if player:
+        index_player(player)
+    return player
+
+def deactivate_player(player_id):
+    """
+    Oznacza gracza jako usuniętego jednym UPDATE - w ramach bieżącej transakcji
+
+    Returns:
+        Player: Usunięty gracz lub None jeśli nie istnieje
+    """
+    player = _returning_player(
+        update(players).where(players.c.id == player_id, players.c.is_active == True).values(
+            is_active=False,
+            updated_at=datetime.utcnow(),
+            change_seq=Counter.increment(CHANGE_SEQUENCE)
+        )
+    )
+    if player:
+        index_player(player)
+    return player
+
+BATCH_OPERATIONS = ('update', 'delete', 'restore')
+
+# Stan, w którym musi być gracz, i status po wykonaniu operacji
+_BATCH_RULES = {
+    'update': (True, 'updated'),
+    'delete': (True, 'deleted'),
+    'restore': (False, 'restored')
+}
+
+def _restore_conflicts(player_ids):
+    """Id usuniętych graczy, których nick jest już aktywny (lub powtarza się w tej samej partii)"""
+    rows = db.session.execute(
+        select(players.c.id, players.c.nickname_key)
+        .where(players.c.id.in_(player_ids), players.c.is_active == False)
+        .order_by(players.c.id)
+    ).all()
+    if not rows:
+        return set()
+
+    taken = set(db.session.scalars(
+        select(players.c.nickname_key).where(
+            players.c.nickname_key.in_({key for _, key in rows}), players.c.is_active == True
+        )
+    ))
+    conflicts = set()
+    for player_id, key in rows:
+        if key in taken:
+            conflicts.add(player_id)
+        else:
+            taken.add(key)
+    return conflicts
+
+def apply_batch(operations):
+    """
+    Wykonuje wiele operacji moderacji w bieżącej transakcji - jedno UPDATE (executemany)
+    na rodzaj operacji zamiast osobnego zapytania i commita dla każdego gracza
+
+    Args:
+        operations (list): Zwalidowane operacje {'op', 'id', 'values'}, każde id najwyżej raz
+
+    Returns:
+        dict: id gracza -> status ('updated', 'deleted', 'restored', 'not_found', 'conflict')
+    """
+    if not operations:
+        return {}
+
+    # Rezerwacja numerów zmian jako pierwsza - blokuje zapis, więc poniższe sprawdzenia są aktualne
+    first_seq = Counter.increment(CHANGE_SEQUENCE, len(operations)) - len(operations) + 1
+    now = datetime.utcnow()
+    seqs = {operation['id']: first_seq + index for index, operation in enumerate(operations)}
+
+    conflicts = _restore_conflicts([op['id'] for op in operations if op['op'] == 'restore'])
+
+    # Operacje grupowane według zmienianych kolumn - każda grupa to jedno executemany
+    groups = {}
+    for operation in operations:
+        if operation['id'] in conflicts:
+            continue
+        values = dict(operation.get('values') or {})
+        if operation['op'] == 'delete':
+            values['is_active'] = False
+        elif operation['op'] == 'restore':
+            values['is_active'] = True
+        key = (operation['op'], tuple(sorted(values)))
+        groups.setdefault(key, []).append(dict(
+            {f'b_{name}': value for name, value in values.items()},
+            b_id=operation['id'], b_seq=seqs[operation['id']]
+        ))
+
+    for (op, columns), params in groups.items():
+        required_active = _BATCH_RULES[op][0]
+        statement = update(players).where(
+            players.c.id == bindparam('b_id'), players.c.is_active == required_active
+        ).values(
+            updated_at=now,
+            change_seq=bindparam('b_seq'),
+            **{name: bindparam(f'b_{name}') for name in columns}
+        )
+        db.session.execute(statement, params)
+
+    # Wiersz ma zarezerwowany numer zmiany tylko jeśli UPDATE go objął
+    applied = {
+        player_id for player_id, change_seq in db.session.execute(
+            select(players.c.id, players.c.change_seq).where(players.c.id.in_(list(seqs)))
+        )
+        if change_seq == seqs[player_id]
+    }
+    reindex_players(list(applied))
+
+    results = {}
+    for operation in operations:
+        player_id = operation['id']
+        if player_id in applied:
+            results[player_id] = _BATCH_RULES[operation['op']][1]
+        elif player_id in conflicts:
+            results[player_id] = 'conflict'
+        else:
+            results[player_id] = 'not_found'
+    return results
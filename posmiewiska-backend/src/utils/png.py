@@ -0,0 +1,158 @@
+import struct
+import zlib
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Liczba kanałów dla typów koloru PNG (skala szarości, RGB, paleta, szarość+alfa, RGBA)
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+def _unfilter(data, width, height, bpp, row_bytes):
+    """Odwraca filtry wierszy PNG"""
+    rows = []
+    previous = bytearray(row_bytes)
+    pos = 0
+    
+    for _ in range(height):
+        filter_type = data[pos]
+        row = bytearray(data[pos + 1:pos + 1 + row_bytes])
+        pos += row_bytes + 1
+        
+        if filter_type == 1:
+            for i in range(bpp, row_bytes):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif filter_type == 2:
+            for i in range(row_bytes):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif filter_type == 3:
+            for i in range(row_bytes):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(row_bytes):
+                left = row[i - bpp] if i >= bpp else 0
+                upper_left = previous[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(left, previous[i], upper_left)) & 0xFF
+        elif filter_type != 0:
+            raise ValueError(f"Nieznany filtr PNG: {filter_type}")
+        
+        rows.append(row)
+        previous = row
+    
+    return rows
+
+def decode(data):
+    """
+    Dekoduje obrazek PNG do pikseli RGBA
+
+    Obsługuje obrazki bez przeplotu, 8 bitów na kanał (paleta także 1, 2 i 4 bity) -
+    tak zapisywane są skiny Minecraft.
+
+    Args:
+        data (bytes): Zawartość pliku PNG
+
+    Returns:
+        tuple: (szerokość, wysokość, lista wierszy - każdy jako bytearray RGBA)
+
+    Raises:
+        ValueError: Gdy plik nie jest obsługiwanym PNG
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("To nie jest plik PNG")
+    
+    pos = len(PNG_SIGNATURE)
+    header = None
+    palette = b''
+    transparency = b''
+    idat = []
+    
+    while pos + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += length + 12
+        
+        if chunk_type == b'IHDR':
+            header = struct.unpack('>IIBBBBB', chunk)
+        elif chunk_type == b'PLTE':
+            palette = chunk
+        elif chunk_type == b'tRNS':
+            transparency = chunk
+        elif chunk_type == b'IDAT':
+            idat.append(chunk)
+        elif chunk_type == b'IEND':
+            break
+    
+    if header is None:
+        raise ValueError("Brak nagłówka IHDR")
+    
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if color_type not in _CHANNELS or interlace:
+        raise ValueError("Nieobsługiwany format PNG")
+    if bit_depth != 8 and not (color_type == 3 and bit_depth in (1, 2, 4)):
+        raise ValueError("Nieobsługiwana głębia kolorów PNG")
+    
+    channels = _CHANNELS[color_type]
+    row_bytes = (width * channels * bit_depth + 7) // 8
+    bpp = max(1, channels * bit_depth // 8)
+    raw_rows = _unfilter(zlib.decompress(b''.join(idat)), width, height, bpp, row_bytes)
+    
+    rows = []
+    for raw in raw_rows:
+        if color_type == 6:
+            rows.append(raw)
+            continue
+        
+        out = bytearray(width * 4)
+        for x in range(width):
+            if color_type == 2:
+                r, g, b = raw[x * 3:x * 3 + 3]
+                a = 255
+            elif color_type == 0:
+                r = g = b = raw[x]
+                a = 255
+            elif color_type == 4:
+                r = g = b = raw[x * 2]
+                a = raw[x * 2 + 1]
+            else:
+                if bit_depth == 8:
+                    index = raw[x]
+                else:
+                    per_byte = 8 // bit_depth
+                    shift = 8 - bit_depth * (x % per_byte + 1)
+                    index = (raw[x // per_byte] >> shift) & ((1 << bit_depth) - 1)
+                r, g, b = palette[index * 3:index * 3 + 3]
+                a = transparency[index] if index < len(transparency) else 255
+            out[x * 4:x * 4 + 4] = bytes((r, g, b, a))
+        rows.append(out)
+    
+    return width, height, rows
+
+def _chunk(chunk_type, data):
+    return struct.pack('>I', len(data)) + chunk_type + data + struct.pack('>I', zlib.crc32(chunk_type + data))
+
+def encode(width, height, rows):
+    """
+    Koduje piksele RGBA do pliku PNG
+
+    Args:
+        width (int): Szerokość
+        height (int): Wysokość
+        rows (list): Wiersze pikseli RGBA (po width * 4 bajtów)
+
+    Returns:
+        bytes: Zawartość pliku PNG
+    """
+    raw = b''.join(b'\x00' + bytes(row) for row in rows)
+    header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+    return (
+        PNG_SIGNATURE
+        + _chunk(b'IHDR', header)
+        + _chunk(b'IDAT', zlib.compress(raw, 6))
+        + _chunk(b'IEND', b'')
+    )
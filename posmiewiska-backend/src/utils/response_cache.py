@@ -0,0 +1,315 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, make_response, request
+from src.utils.sqlite_store import LocalConnection
+
+class ResponseCache:
+    """
+    Cache odpowiedzi JSON współdzielony przez wszystkie workery gunicorna
+
+    Wpisy trzymane są w osobnym pliku SQLite, więc każdy proces widzi ten sam stan.
+    Unieważnianie odbywa się przez licznik generacji danych - każdy zapis go podbija,
+    a wpisy z poprzednich generacji przestają być zwracane. Plik dostaje przy utworzeniu
+    losową epokę - po jego usunięciu generacje liczą się od nowa, a epoka się zmienia.
+    """
+    
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'cache.db')
+    MAX_ENTRIES = 2000
+    MAX_BYTES = 32 * 1024 * 1024  # 32 MB
+    ACCESS_UPDATE_SECONDS = 60  # Co ile najczęściej odświeżać czas użycia wpisu (LRU)
+    STATS_FLUSH_COUNT = 100  # Po ilu trafieniach/chybieniach zapisać liczniki procesu do pliku
+    STATS_FLUSH_SECONDS = 10  # Najdłuższy czas trzymania liczników w pamięci procesu
+    
+    def __init__(self, path=None, max_entries=None, max_bytes=None):
+        self.path = path or os.environ.get('RESPONSE_CACHE_PATH', self.DEFAULT_PATH)
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self._db = LocalConnection(self.path, schema=(
+            'CREATE TABLE IF NOT EXISTS generations (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+            'CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+            'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)',
+            "INSERT OR IGNORE INTO meta (name, value) VALUES ('epoch', lower(hex(randomblob(8))))",
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key TEXT PRIMARY KEY, namespace TEXT NOT NULL, generation INTEGER NOT NULL, '
+            'body BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS ix_entries_last_access ON entries (last_access)'
+        ))
+        # Liczniki trafień i chybień zbierane w pamięci - odczyt z cache nie zapisuje do pliku
+        self._stats_lock = threading.Lock()
+        self._pending_stats = {}
+        self._pending_count = 0
+        self._stats_flushed_at = time.monotonic()
+        self._stats_pid = os.getpid()
+    
+    def _connect(self):
+        return self._db.get()
+    
+    def _increment_stat(self, conn, name, amount=1):
+        conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+    
+    def _count(self, name):
+        """Zlicza trafienie lub chybienie w pamięci i co jakiś czas zapisuje liczniki do pliku"""
+        with self._stats_lock:
+            if self._stats_pid != os.getpid():
+                # Liczniki procesu nadrzędnego (preload_app) zapisze on sam
+                self._pending_stats = {}
+                self._pending_count = 0
+                self._stats_pid = os.getpid()
+            self._pending_stats[name] = self._pending_stats.get(name, 0) + 1
+            self._pending_count += 1
+            if (self._pending_count < self.STATS_FLUSH_COUNT
+                    and time.monotonic() - self._stats_flushed_at < self.STATS_FLUSH_SECONDS):
+                return
+            pending = self._take_pending_stats()
+        self._write_stats(pending)
+    
+    def _take_pending_stats(self):
+        pending = self._pending_stats if self._stats_pid == os.getpid() else {}
+        self._pending_stats = {}
+        self._pending_count = 0
+        self._stats_flushed_at = time.monotonic()
+        self._stats_pid = os.getpid()
+        return pending
+    
+    def _write_stats(self, pending):
+        if not pending:
+            return
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                for name, amount in pending.items():
+                    self._increment_stat(conn, name, amount)
+        except sqlite3.Error:
+            pass  # Liczniki są tylko statystyką
+    
+    def flush_stats(self):
+        """Zapisuje do pliku liczniki zebrane w pamięci procesu"""
+        with self._stats_lock:
+            pending = self._take_pending_stats()
+        self._write_stats(pending)
+    
+    def get_generation(self, name='players'):
+        """Zwraca bieżącą generację danych"""
+        try:
+            row = self._connect().execute(
+                'SELECT value FROM generations WHERE name = ?', (name,)
+            ).fetchone()
+            return row[0] if row else 0
+        except sqlite3.Error:
+            return 0
+    
+    def get_version(self, name='players'):
+        """
+        Wersja danych do ETagów - epoka pliku cache i generacja, odczytane razem
+
+        Returns:
+            tuple: (epoka, generacja) lub None, jeśli odczyt się nie powiódł
+        """
+        try:
+            return self._connect().execute(
+                "SELECT (SELECT value FROM meta WHERE name = 'epoch'), "
+                "COALESCE((SELECT value FROM generations WHERE name = ?), 0)",
+                (name,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+    
+    def bump_generation(self, name='players'):
+        """
+        Podbija generację danych - unieważnia wszystkie wpisy z tej przestrzeni nazw
+
+        Returns:
+            int: Nowa generacja lub None w przypadku błędu
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(
+                    'INSERT INTO generations (name, value) VALUES (?, 1) '
+                    'ON CONFLICT(name) DO UPDATE SET value = value + 1',
+                    (name,)
+                )
+                conn.execute('DELETE FROM entries WHERE namespace = ?', (name,))
+                return conn.execute(
+                    'SELECT value FROM generations WHERE name = ?', (name,)
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Błąd podczas unieważniania cache odpowiedzi: {e}")
+            return None
+    
+    def get(self, key, generation):
+        """
+        Pobiera wpis z cache
+
+        Trafienie to sam odczyt - czas użycia wpisu jest odświeżany najwyżej
+        co ACCESS_UPDATE_SECONDS, a liczniki trafień zbierane w pamięci procesu.
+
+        Returns:
+            bytes: Zapisana odpowiedź lub None (brak wpisu lub wpis z innej generacji)
+        """
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                'SELECT body, last_access FROM entries WHERE key = ? AND generation = ?', (key, generation)
+            ).fetchone()
+            if row is None:
+                self._count('misses')
+                return None
+            
+            body, last_access = row
+            now = time.time()
+            # Przybliżone LRU - bez zapisu do pliku przy każdym trafieniu
+            if now - last_access >= self.ACCESS_UPDATE_SECONDS:
+                conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (now, key))
+            self._count('hits')
+            return body
+        except sqlite3.Error:
+            return None
+    
+    def set(self, key, generation, body, namespace='players'):
+        """Zapisuje odpowiedź w cache i usuwa najdawniej używane wpisy ponad limit"""
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, namespace, generation, body, size, last_access) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    (key, namespace, generation, body, len(body), time.time())
+                )
+                self._evict(conn)
+        except sqlite3.Error as e:
+            print(f"Błąd podczas zapisu do cache odpowiedzi: {e}")
+    
+    def _evict(self, conn):
+        """Usuwa najdawniej używane wpisy aż cache zmieści się w limitach (LRU)"""
+        count, total_bytes = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+        ).fetchone()
+        if count <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        
+        evicted = 0
+        for key, size in conn.execute(
+            'SELECT key, size FROM entries ORDER BY last_access'
+        ).fetchall():
+            if count <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            count -= 1
+            total_bytes -= size
+            evicted += 1
+        
+        self._increment_stat(conn, 'evictions', evicted)
+    
+    def clear(self):
+        """Usuwa wszystkie wpisy i zeruje liczniki"""
+        with self._stats_lock:
+            self._take_pending_stats()
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute('DELETE FROM entries')
+                conn.execute('DELETE FROM stats')
+        except sqlite3.Error as e:
+            print(f"Błąd podczas czyszczenia cache odpowiedzi: {e}")
+    
+    def stats(self):
+        """
+        Zwraca liczniki trafień, chybień i zajętość cache
+
+        Liczniki pozostałych workerów mogą być opóźnione o STATS_FLUSH_SECONDS.
+        """
+        self.flush_stats()
+        conn = self._connect()
+        counters = dict(conn.execute('SELECT name, value FROM stats').fetchall())
+        entries, total_bytes = conn.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries'
+        ).fetchone()
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+            'evictions': counters.get('evictions', 0),
+            'entries': entries,
+            'bytes': total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'generation': self.get_generation()
+        }
+
+def cache_key():
+    """Klucz cache dla bieżącego żądania - ścieżka i posortowane parametry zapytania"""
+    args = sorted(request.args.items(multi=True))
+    return f"{request.path}?{urlencode(args)}"
+
+def compute_etag(key, version, namespace='players'):
+    """Silny ETag odpowiedzi - zależy tylko od klucza żądania i wersji danych (epoka, generacja)"""
+    epoch, generation = version
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return f"{namespace}-{epoch}-{generation}-{digest}"
+
+def _apply_cache_headers(response, etag):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = current_app.config.get(
+        'PLAYERS_CACHE_CONTROL', 'public, no-cache'
+    )
+    return response
+
+def cached_response(namespace='players'):
+    """
+    Dekorator buforujący odpowiedzi JSON endpointu do zmiany generacji danych
+
+    Odpowiedzi dostają ETag wyliczony z wersji danych, więc żądanie warunkowe
+    (If-None-Match) dostaje puste 304 bez wykonywania zapytania i serializacji.
+    Gdy wersji nie da się odczytać, odpowiedź jest generowana bez cache i bez ETagu.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = cache_key()
+            version = response_cache.get_version(namespace)
+            if version is None:
+                response = make_response(f(*args, **kwargs))
+                response.headers['X-Cache'] = 'BYPASS'
+                return response
+            
+            generation = version[1]
+            etag = compute_etag(key, version, namespace)
+            
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+                return _apply_cache_headers(response, etag)
+            
+            body = response_cache.get(key, generation)
+            if body is not None:
+                response = current_app.response_class(body, mimetype='application/json')
+                response.headers['X-Cache'] = 'HIT'
+                return _apply_cache_headers(response, etag)
+            
+            response = make_response(f(*args, **kwargs))
+            response.headers['X-Cache'] = 'MISS'
+            # Buforujemy tylko poprawne odpowiedzi - błędy mogą być przejściowe
+            if response.status_code == 200 and response.mimetype == 'application/json':
+                response_cache.set(key, generation, response.get_data(), namespace)
+                _apply_cache_headers(response, etag)
+            return response
+        return decorated_function
+    return decorator
+
+# Globalna instancja dla łatwego użycia
+response_cache = ResponseCache()
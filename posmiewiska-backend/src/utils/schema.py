@@ -0,0 +1,135 @@
+from sqlalchemy import MetaData, UniqueConstraint, inspect, text
+from sqlalchemy.schema import CreateTable
+from src.models.user import db
+
+def _backfill_nickname_keys(conn):
+    """
+    Uzupełnia players.nickname_key dla istniejących wierszy
+
+    Wcześniej nicki różniące się tylko wielkością liter mogły być aktywne jednocześnie -
+    zostaje najstarszy wpis, pozostałe są oznaczane jako usunięte (numer zmiany nadaje
+    im ensure_change_feed, więc trafią do kanału zmian).
+    """
+    conn.execute(text('UPDATE players SET nickname_key = lower(nickname) WHERE nickname_key IS NULL'))
+    duplicates = [row[0] for row in conn.execute(text(
+        'SELECT id FROM players WHERE is_active = 1 AND id NOT IN '
+        '(SELECT min(id) FROM players WHERE is_active = 1 GROUP BY nickname_key)'
+    ))]
+    if not duplicates:
+        return
+
+    print(f"Dezaktywowano {len(duplicates)} zduplikowanych nicków (różniących się wielkością liter)")
+    for player_id in duplicates:
+        conn.execute(
+            text('UPDATE players SET is_active = 0, change_seq = NULL WHERE id = :id'), {'id': player_id}
+        )
+    if 'players_fts' in inspect(conn).get_table_names():
+        for player_id in duplicates:
+            conn.execute(text('DELETE FROM players_fts WHERE rowid = :id'), {'id': player_id})
+
+# Migracje danych uruchamiane po dodaniu kolumny do istniejącej tabeli
+COLUMN_MIGRATIONS = {
+    ('players', 'nickname_key'): _backfill_nickname_keys
+}
+
+def _model_unique_columns(table):
+    """Zbiory kolumn z ograniczeniem UNIQUE zadeklarowanym w modelu"""
+    unique = {frozenset([column.name]) for column in table.columns if column.unique}
+    for constraint in table.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            unique.add(frozenset(column.name for column in constraint.columns))
+    return unique
+
+def _rebuild_sqlite_table(table):
+    """
+    Przebudowuje tabelę SQLite według modelu
+
+    SQLite nie pozwala usunąć ograniczenia UNIQUE - tabela jest tworzona na nowo
+    pod tymczasową nazwą, dane kopiowane z zachowaniem id, a indeksy zakłada
+    później ensure_schema().
+    """
+    temp_name = f'{table.name}_rebuild'
+    temp_table = table.to_metadata(MetaData(), name=temp_name)
+    columns = ', '.join(column.name for column in table.columns)
+
+    with db.engine.begin() as conn:
+        conn.execute(text(f'DROP TABLE IF EXISTS {temp_name}'))
+        conn.execute(CreateTable(temp_table))
+        conn.execute(text(f'INSERT INTO {temp_name} ({columns}) SELECT {columns} FROM {table.name}'))
+        conn.execute(text(f'DROP TABLE {table.name}'))
+        conn.execute(text(f'ALTER TABLE {temp_name} RENAME TO {table.name}'))
+
+def _existing_unique_constraints(inspector, table_name):
+    """Ograniczenia UNIQUE tabeli w bazie: lista {'name', 'column_names'}"""
+    if db.engine.dialect.name != 'sqlite':
+        return inspector.get_unique_constraints(table_name)
+
+    # Inspektor SQLAlchemy nie widzi UNIQUE zadeklarowanego przy kolumnie - czytamy indeksy
+    # automatyczne SQLite (origin 'u')
+    constraints = []
+    with db.engine.connect() as conn:
+        for row in conn.execute(text(f"PRAGMA index_list('{table_name}')")):
+            if row[3] != 'u':
+                continue
+            columns = [info[2] for info in conn.execute(text(f"PRAGMA index_info('{row[1]}')"))]
+            constraints.append({'name': row[1], 'column_names': columns})
+    return constraints
+
+def _drop_stale_unique_constraints(inspector, table):
+    """Usuwa ograniczenia UNIQUE, których model już nie deklaruje"""
+    model_unique = _model_unique_columns(table)
+    stale = [
+        constraint for constraint in _existing_unique_constraints(inspector, table.name)
+        if frozenset(constraint['column_names']) not in model_unique
+    ]
+    if not stale:
+        return
+
+    if db.engine.dialect.name == 'sqlite':
+        _rebuild_sqlite_table(table)
+        return
+
+    with db.engine.begin() as conn:
+        for constraint in stale:
+            conn.execute(text(f'ALTER TABLE {table.name} DROP CONSTRAINT {constraint["name"]}'))
+
+def ensure_schema():
+    """
+    Uzupełnia schemat istniejącej bazy danych
+
+    db.create_all() tworzy tylko brakujące tabele - kolumny i indeksy dodane do modeli
+    po utworzeniu tabeli trzeba założyć osobno. Nowe kolumny dodawane są jako NULL-owalne,
+    wartości dla istniejących wierszy uzupełniają COLUMN_MIGRATIONS lub kod, który je wprowadził.
+    Ograniczenia UNIQUE usunięte z modelu są usuwane także z bazy.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        added_columns = [column for column in table.columns if column.name not in existing_columns]
+        with db.engine.begin() as conn:
+            for column in added_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            # Migracje danych dopiero gdy tabela ma już wszystkie kolumny modelu
+            for column in added_columns:
+                migration = COLUMN_MIGRATIONS.get((table.name, column.name))
+                if migration:
+                    migration(conn)
+
+        _drop_stale_unique_constraints(inspector, table)
+
+    # Przebudowa tabel usuwa ich indeksy - stan bazy czytamy od nowa
+    inspector = inspect(db.engine)
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
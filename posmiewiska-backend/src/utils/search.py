@@ -0,0 +1,113 @@
+from sqlalchemy import bindparam, column, or_, table, text
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.models.player import Player
+
+# Tabela FTS5 z tokenizerem trigram - odzwierciedla nickname i reason aktywnych graczy,
+# rowid odpowiada players.id
+FTS_TABLE = 'players_fts'
+players_fts = table(FTS_TABLE, column('rowid'), column('rank'))
+
+# Trigram nie dopasowuje fraz krótszych niż 3 znaki
+MIN_FTS_TERM_LENGTH = 3
+
+_fts_available = False
+
+def ensure_search_index():
+    """Tworzy indeks pełnotekstowy (jeśli SQLite go obsługuje) i wypełnia go aktywnymi graczami"""
+    global _fts_available
+    
+    if db.engine.dialect.name != 'sqlite':
+        _fts_available = False
+        return
+    
+    try:
+        exists = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        if not exists:
+            db.session.execute(text(
+                f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(nickname, reason, tokenize='trigram')"
+            ))
+            db.session.execute(text(
+                f"INSERT INTO {FTS_TABLE}(rowid, nickname, reason) "
+                f"SELECT id, nickname, reason FROM players WHERE is_active = 1"
+            ))
+            db.session.commit()
+        _fts_available = True
+    except OperationalError:
+        # Starsze SQLite (< 3.34) nie mają tokenizera trigram - zostaje wyszukiwanie przez LIKE
+        db.session.rollback()
+        _fts_available = False
+
+def index_player(player):
+    """
+    Synchronizuje wpis gracza w indeksie - w ramach bieżącej transakcji
+
+    Aktywni gracze są (ponownie) indeksowani, nieaktywni usuwani z indeksu.
+    """
+    if not _fts_available:
+        return
+    
+    if player.id is None:
+        db.session.flush()
+    
+    unindex_player(player.id)
+    if player.is_active:
+        db.session.execute(
+            text(f"INSERT INTO {FTS_TABLE}(rowid, nickname, reason) VALUES (:id, :nickname, :reason)"),
+            {'id': player.id, 'nickname': player.nickname, 'reason': player.reason}
+        )
+
+def unindex_player(player_id):
+    """Usuwa gracza z indeksu - w ramach bieżącej transakcji"""
+    if not _fts_available:
+        return
+    
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': player_id})
+
+def reindex_players(player_ids):
+    """Synchronizuje w indeksie wielu graczy naraz (np. po imporcie) - w ramach bieżącej transakcji"""
+    if not _fts_available or not player_ids:
+        return
+    
+    params = {'ids': list(player_ids)}
+    db.session.execute(
+        text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True)),
+        params
+    )
+    db.session.execute(
+        text(
+            f"INSERT INTO {FTS_TABLE}(rowid, nickname, reason) "
+            f"SELECT id, nickname, reason FROM players WHERE is_active = 1 AND id IN :ids"
+        ).bindparams(bindparam('ids', expanding=True)),
+        params
+    )
+
+def _fts_query(term):
+    """Zamienia frazę na zapytanie FTS5 - cała fraza jako jeden ciąg, bez operatorów"""
+    return '"' + term.replace('"', '""') + '"'
+
+def apply_search(query, term, ranked=True):
+    """
+    Zawęża zapytanie o graczy do pasujących do frazy (podciąg nicku lub powodu)
+
+    Args:
+        query: Zapytanie o graczy
+        term (str): Szukana fraza
+        ranked (bool): Czy sortować wyniki według trafności
+
+    Returns:
+        Zawężone zapytanie
+    """
+    if _fts_available and len(term) >= MIN_FTS_TERM_LENGTH:
+        query = query.join(players_fts, players_fts.c.rowid == Player.id).filter(
+            text(f'{FTS_TABLE} MATCH :fts_query').bindparams(fts_query=_fts_query(term))
+        )
+        if ranked:
+            query = query.order_by(players_fts.c.rank)
+        return query
+    
+    pattern = f'%{term}%'
+    return query.filter(or_(Player.nickname.ilike(pattern), Player.reason.ilike(pattern)))
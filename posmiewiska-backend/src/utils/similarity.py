@@ -0,0 +1,124 @@
+# Znaki "leet" zamieniane na litery, które przypominają - Cl4stk0 -> clastko;
+# l i wielkie I wyglądają w grze tak samo
+LEET_TRANSLATION = str.maketrans({
+    '0': 'o', '1': 'i', '3': 'e', '4': 'a', '5': 's', '7': 't', '8': 'b', '9': 'g', 'l': 'i', '_': None
+})
+
+def nickname_skeleton(nickname):
+    """
+    Postać nicku do porównań podobieństwa: małe litery, cyfry leet zamienione
+    na litery, bez podkreślników (inary_ i inary__ mają ten sam szkielet)
+    """
+    return nickname.lower().translate(LEET_TRANSLATION)
+
+def _pattern(text):
+    """Maski bitowe pozycji znaków - wzorzec dla edit_distance()"""
+    masks = {}
+    for position, char in enumerate(text):
+        masks[char] = masks.get(char, 0) | (1 << position)
+    return masks, len(text)
+
+def edit_distance(pattern, text):
+    """
+    Odległość Levenshteina (algorytm bitowy Myersa) - nicki mają najwyżej 16 znaków,
+    więc cała kolumna macierzy mieści się w jednej liczbie
+
+    Args:
+        pattern: Wynik _pattern() dla pierwszego napisu
+        text (str): Drugi napis
+    """
+    masks, length = pattern
+    if not length:
+        return len(text)
+
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive, negative, score = full, 0, length
+    for char in text:
+        equal = masks.get(char, 0)
+        vertical = equal | negative
+        horizontal = (((equal & positive) + positive) ^ positive) | equal
+        horizontal_positive = (negative | ~(horizontal | positive)) & full
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            score += 1
+        elif horizontal_negative & last:
+            score -= 1
+        horizontal_positive = ((horizontal_positive << 1) | 1) & full
+        horizontal_negative = (horizontal_negative << 1) & full
+        positive = (horizontal_negative | ~(vertical | horizontal_positive)) & full
+        negative = horizontal_positive & vertical
+    return score
+
+def search_candidates(skeleton, candidates, max_distance):
+    """
+    Przeszukuje listę szkieletów po kolei - dla krótkich list zamiast drzewa BK
+
+    Returns:
+        list: Krotki (odległość, szkielet) dla szkieletów w odległości najwyżej max_distance
+    """
+    pattern = _pattern(skeleton)
+    results = []
+    for candidate in candidates:
+        distance = edit_distance(pattern, candidate)
+        if distance <= max_distance:
+            results.append((distance, candidate))
+    return results
+
+class BKTree:
+    """
+    Drzewo BK szkieletów nicków - wyszukiwanie w odległości edycyjnej bez porównywania
+    z każdym wpisem (nierówność trójkąta odcina całe poddrzewa)
+
+    Drzewo przechowuje tylko szkielety i po zbudowaniu się nie zmienia - wyszukiwanie
+    może działać bez blokady. Przypisanie szkieletów do nicków i nowe szkielety
+    trzyma PlayerIndex.
+    """
+
+    def __init__(self, skeletons=()):
+        self._root = None  # [szkielet, {odległość: węzeł}]
+        self._skeletons = set()
+        for skeleton in skeletons:
+            self._add(skeleton)
+
+    def _add(self, skeleton):
+        if skeleton in self._skeletons:
+            return
+        self._skeletons.add(skeleton)
+        if self._root is None:
+            self._root = [skeleton, {}]
+            return
+
+        node = self._root
+        pattern = _pattern(skeleton)
+        while True:
+            distance = edit_distance(pattern, node[0])
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [skeleton, {}]
+                return
+            node = child
+
+    def __contains__(self, skeleton):
+        return skeleton in self._skeletons
+
+    def search(self, skeleton, max_distance):
+        """
+        Returns:
+            list: Krotki (odległość, szkielet) dla szkieletów w odległości najwyżej max_distance
+        """
+        if self._root is None:
+            return []
+
+        pattern = _pattern(skeleton)
+        results = []
+        stack = [self._root]
+        while stack:
+            node_skeleton, children = stack.pop()
+            distance = edit_distance(pattern, node_skeleton)
+            if distance <= max_distance:
+                results.append((distance, node_skeleton))
+            for child_distance, child in children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return results
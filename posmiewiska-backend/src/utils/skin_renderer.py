@@ -0,0 +1,110 @@
+from src.utils import png
+
+# Obszary skina Minecraft (x, y, szerokość, wysokość)
+HEAD = (8, 8, 8, 8)
+HAT = (40, 8, 8, 8)
+TORSO = (20, 20, 8, 12)
+RIGHT_ARM = (44, 20, 4, 12)
+LEFT_ARM = (36, 52, 4, 12)  # Tylko skiny 64x64
+RIGHT_LEG = (4, 20, 4, 12)
+LEFT_LEG = (20, 52, 4, 12)  # Tylko skiny 64x64
+
+def _crop(rows, region, mirror=False):
+    """Wycina obszar skina jako listę wierszy RGBA"""
+    x, y, width, height = region
+    cropped = [bytearray(row[x * 4:(x + width) * 4]) for row in rows[y:y + height]]
+    if mirror:
+        cropped = [
+            bytearray(b''.join(bytes(row[i * 4:i * 4 + 4]) for i in reversed(range(width))))
+            for row in cropped
+        ]
+    return cropped
+
+def _blank(width, height):
+    return [bytearray(width * 4) for _ in range(height)]
+
+def _paste(canvas, part, left, top, blend=False):
+    """Nakłada fragment na płótno - z mieszaniem kanału alfa (nakładka hełmu) lub bez"""
+    for dy, row in enumerate(part):
+        target = canvas[top + dy]
+        for dx in range(len(row) // 4):
+            src = row[dx * 4:dx * 4 + 4]
+            offset = (left + dx) * 4
+            if not blend:
+                target[offset:offset + 4] = src
+                continue
+            
+            alpha = src[3]
+            if alpha == 0:
+                continue
+            if alpha == 255:
+                target[offset:offset + 4] = src
+                continue
+            for channel in range(3):
+                target[offset + channel] = (
+                    src[channel] * alpha + target[offset + channel] * (255 - alpha)
+                ) // 255
+            target[offset + 3] = max(target[offset + 3], alpha)
+
+def _opaque(rows):
+    """Ustawia pełną nieprzezroczystość (twarz na skinie bywa zapisana z alfą 0)"""
+    for row in rows:
+        row[3::4] = b'\xff' * (len(row) // 4)
+    return rows
+
+def scale(rows, width, height, target_width, target_height):
+    """Skalowanie metodą najbliższego sąsiada"""
+    columns = [x * width // target_width for x in range(target_width)]
+    scaled_sources = {}
+    scaled_rows = []
+    for y in range(target_height):
+        source_index = y * height // target_height
+        # Przy powiększaniu wiele wierszy wyniku pochodzi z tego samego wiersza źródła
+        if source_index not in scaled_sources:
+            source = rows[source_index]
+            scaled_sources[source_index] = b''.join(bytes(source[c * 4:c * 4 + 4]) for c in columns)
+        scaled_rows.append(scaled_sources[source_index])
+    return scaled_rows
+
+def render(skin_data, kind, size):
+    """
+    Renderuje obrazek gracza ze skina
+
+    Args:
+        skin_data (bytes): Plik PNG ze skinem (64x64 lub starszy 64x32)
+        kind (str): Rodzaj obrazka - avatar (twarz), helm (twarz z nakładką) lub body (sylwetka z przodu)
+        size (int): Szerokość wynikowego obrazka (body ma wysokość 2 * size)
+
+    Returns:
+        bytes: Plik PNG
+
+    Raises:
+        ValueError: Gdy skin ma nieobsługiwany format lub wymiary
+    """
+    width, height, rows = png.decode(skin_data)
+    if width != 64 or height not in (32, 64):
+        raise ValueError(f"Nieobsługiwane wymiary skina: {width}x{height}")
+    legacy = height == 32
+    
+    if kind == 'avatar':
+        canvas = _opaque(_crop(rows, HEAD))
+        target_width, target_height = size, size
+    elif kind == 'helm':
+        canvas = _opaque(_crop(rows, HEAD))
+        _paste(canvas, _crop(rows, HAT), 0, 0, blend=True)
+        target_width, target_height = size, size
+    elif kind == 'body':
+        canvas = _blank(16, 32)
+        _paste(canvas, _opaque(_crop(rows, HEAD)), 4, 0)
+        _paste(canvas, _crop(rows, TORSO), 4, 8)
+        _paste(canvas, _crop(rows, RIGHT_ARM), 0, 8)
+        _paste(canvas, _crop(rows, RIGHT_ARM, mirror=True) if legacy else _crop(rows, LEFT_ARM), 12, 8)
+        _paste(canvas, _crop(rows, RIGHT_LEG), 4, 20)
+        _paste(canvas, _crop(rows, RIGHT_LEG, mirror=True) if legacy else _crop(rows, LEFT_LEG), 8, 20)
+        target_width, target_height = size, size * 2
+    else:
+        raise ValueError(f"Nieznany rodzaj obrazka: {kind}")
+    
+    source_width = len(canvas[0]) // 4
+    scaled = scale(canvas, source_width, len(canvas), target_width, target_height)
+    return png.encode(target_width, target_height, scaled)
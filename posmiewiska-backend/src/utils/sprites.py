@@ -0,0 +1,107 @@
+import hashlib
+from src.utils import png
+from src.utils.minotar import minotar
+from src.utils.skin_renderer import scale
+
+SPRITE_COLUMNS = 10  # Liczba awatarów w jednym wierszu arkusza
+# Rozmiary awatarów w arkuszu - endpoint jest publiczny, a arkusz 100 awatarów 512 px
+# to 5120x5120 RGBA kodowane w czystym Pythonie (sekundy CPU i setki MB na żądanie)
+MAX_SPRITE_SIZE = 64
+SPRITE_SIZES = tuple(size for size in minotar.VALID_SIZES if size <= MAX_SPRITE_SIZE)
+SHEET_BUILD_SECONDS = 5  # Jak długo czekać na pobranie brakujących awatarów arkusza
+PARTIAL_SHEET_SECONDS = 60  # Jak długo trzymać w cache arkusz z obrazkami zastępczymi
+
+def sprite_offset(index, size, columns=SPRITE_COLUMNS):
+    """
+    Zwraca położenie awatara w arkuszu
+
+    Args:
+        index (int): Pozycja gracza na stronie
+        size (int): Rozmiar awatara w pikselach
+
+    Returns:
+        dict: Współrzędne lewego górnego rogu {'x', 'y'}
+    """
+    return {'x': (index % columns) * size, 'y': (index // columns) * size}
+
+def sheet_digest(players, size):
+    """Skrót arkusza - zależy od graczy na stronie, ich kolejności i daty ostatniej zmiany"""
+    parts = [str(size)] + [
+        f"{player.id}:{player.updated_at.isoformat() if player.updated_at else ''}" for player in players
+    ]
+    return hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+def _read_avatar(path, size):
+    """Wczytuje awatar jako wiersze RGBA w zadanym rozmiarze"""
+    with open(path, 'rb') as f:
+        width, height, rows = png.decode(f.read())
+    if width != size or height != size:
+        rows = scale(rows, width, height, size, size)
+    return rows
+
+def build_sprite_sheet(players, size):
+    """
+    Zwraca arkusz ze wszystkimi awatarami strony graczy - budowany leniwie i zapisywany w cache
+
+    Awatary są pobierane najwyżej przez SHEET_BUILD_SECONDS. Arkusz, w którym któryś
+    awatar zastąpiono obrazkiem zastępczym (błąd lub brak odpowiedzi Minotar), trafia do
+    cache tylko na PARTIAL_SHEET_SECONDS. Arkusze są oznaczone id i nickami graczy -
+    zmiana gracza lub pobranie nowej wersji jego obrazka usuwa je z cache.
+
+    Args:
+        players (list): Gracze w kolejności strony
+        size (int): Rozmiar pojedynczego awatara
+
+    Returns:
+        dict: Ścieżka do pliku PNG z arkuszem ('path') i ETag z jego zawartości ('etag')
+    """
+    digest = sheet_digest(players, size)
+    key = f"sprite/{digest}/{size}"
+    partial_key = f"{key}/partial"
+    cached = minotar.cache_get(key) or minotar.cache_get(partial_key, max_age=PARTIAL_SHEET_SECONDS)
+    if cached:
+        return cached
+    
+    # Brakujące awatary pobieramy równolegle zanim zaczniemy składać arkusz
+    results = minotar.prefetch(
+        [player.nickname for player in players], sizes=(size,), timeout=SHEET_BUILD_SECONDS
+    )
+    paths = {result['nickname'].lower(): result['path'] for result in results if result['path']}
+    # Nieprawidłowy nick zawsze ma domyślny awatar - arkusz z nim jest kompletny
+    invalid = {result['nickname'].lower() for result in results if result['status'] == 'invalid'}
+    
+    columns = min(len(players), SPRITE_COLUMNS)
+    row_count = (len(players) + columns - 1) // columns
+    sheet = [bytearray(columns * size * 4) for _ in range(row_count * size)]
+    complete = True
+    
+    for index, player in enumerate(players):
+        offset = sprite_offset(index, size, columns)
+        path = paths.get(player.nickname.lower())
+        if path is None:
+            complete = complete and player.nickname.lower() in invalid
+            path = minotar.fallback_avatar(player.nickname, size)
+        try:
+            avatar = _read_avatar(path, size)
+        except (OSError, ValueError):
+            complete = False
+            avatar = _read_avatar(minotar.DEFAULT_AVATAR_PATH, size)
+        
+        left = offset['x'] * 4
+        for dy, row in enumerate(avatar):
+            sheet[offset['y'] + dy][left:left + size * 4] = row
+    
+    content = png.encode(columns * size, row_count * size, sheet)
+    etag = hashlib.sha1(content).hexdigest()
+    tags = [f"player:{player.id}" for player in players]
+    tags += [minotar.nickname_tag(player.nickname) for player in players]
+    path = minotar.cache_put(
+        key if complete else partial_key,
+        f"sprite_{size}_{digest}" if complete else f"sprite_{size}_{digest}_partial",
+        content, tags=tags, etag=etag
+    )
+    return {'path': path, 'etag': etag}
+
+def invalidate_sprite_sheets(player_id):
+    """Usuwa z cache arkusze zawierające danego gracza"""
+    minotar.cache_drop_tag(f"player:{player_id}")
@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import threading
+
+class LocalConnection:
+    """
+    Połączenie SQLite osobne dla każdego wątku i procesu
+
+    Gunicorn z preload_app=True forkuje workery po załadowaniu aplikacji - połączenia
+    otwarte w procesie nadrzędnym nie mogą być używane w workerach, dlatego połączenie
+    jest otwierane leniwie i ponownie po zmianie PID. Po usunięciu lub podmianie pliku
+    (np. ręczne czyszczenie cache) połączenie jest otwierane od nowa - stare wskazywałoby
+    usunięty plik, niewidoczny dla pozostałych procesów.
+    """
+    
+    def __init__(self, path, schema=(), columns=None, timeout=5):
+        """
+        Args:
+            path (str): Ścieżka do pliku bazy
+            schema (tuple): Instrukcje SQL wykonywane po otwarciu połączenia (CREATE ... IF NOT EXISTS)
+            columns (dict): Kolumny dodane po utworzeniu tabeli, {tabela: {kolumna: typ}} -
+                dopisywane do istniejących plików przez ALTER TABLE
+            timeout (float): Czas oczekiwania na blokadę zapisu w sekundach
+        """
+        self.path = path
+        self.schema = schema
+        self.columns = columns or {}
+        self.timeout = timeout
+        self._local = threading.local()
+    
+    def get(self):
+        """Zwraca połączenie dla bieżącego wątku (w trybie autocommit)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid() and self._local.file_id == self._file_id():
+            return conn
+        
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in self.schema:
+            conn.execute(statement)
+        for table, columns in self.columns.items():
+            existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+            for name, column_type in columns.items():
+                if name not in existing:
+                    try:
+                        conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+                    except sqlite3.OperationalError:
+                        pass  # Kolumnę dodał w międzyczasie inny proces
+        
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.file_id = self._file_id()
+        return conn
+    
+    def _file_id(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_dev, stat.st_ino